@@ -1,26 +1,73 @@
 from fastapi import FastAPI, WebSocket, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse, ORJSONResponse
+from starlette.background import BackgroundTask
+import asyncio
+import functools
+from contextlib import asynccontextmanager
 import os
+import sys
 import logging
-import httpx
+import uuid
 from datetime import datetime
-from typing import List
+from typing import List, Mapping, Optional, Sequence
+
+import orjson
+import yt_dlp
 
 from ytb.models import (
     VideoInfoRequest, VideoInfo, DownloadRequest
 )
 from ytb.downloader import YTDownloader
-from ytb.config import Config
+from ytb.config import Config, atomic_write
 from ytb.history_manager import HistoryManager
 from ytb.updater import YtDlpUpdater
 from ytb.browser_cookies import BrowserCookieExtractor
-from wecom import WeComService
-from wecom.message_templates import MessageTemplates
+from ytb.cookiecloud import CookieCloud
 from version import __version__
 
-app = FastAPI(title="YouTube Video Downloader API")
+# 缩略图代理共用的 httpx 客户端（首次使用时创建），复用连接池避免每次请求重新握手
+thumbnail_client = None
+
+
+def get_thumbnail_client():
+    """获取共享的缩略图代理客户端"""
+    global thumbnail_client
+    if thumbnail_client is None:
+        import httpx
+
+        thumbnail_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=5.0, pool=10.0),
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=100, keepalive_expiry=30),
+            follow_redirects=True,
+        )
+    return thumbnail_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 历史记录的延迟写盘任务只在应用事件循环中创建（下载线程会从其他线程修改历史记录）
+    history_manager.attach_loop(asyncio.get_running_loop())
+    # 下载线程中的错误通知回调同样交给应用事件循环执行
+    downloader.attach_loop(asyncio.get_running_loop())
+    yield
+    downloader.attach_loop(None)
+    # 写入尚未落盘的历史记录修改，之后的修改改为立即写盘
+    await history_manager.flush()
+    history_manager.attach_loop(None)
+    # 企业微信服务已初始化时关闭其连接池
+    if get_wecom_service.cache_info().currsize:
+        await get_wecom_service().close()
+    if thumbnail_client is not None:
+        await thumbnail_client.aclose()
+
+
+app = FastAPI(
+    title="YouTube Video Downloader API",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
 
 # CORS配置
 app.add_middleware(
@@ -31,8 +78,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 运行环境与路径在进程生命周期内不会变化，启动时计算一次
+IN_DOCKER = os.path.exists("/app")
+BASE_DIR = os.path.dirname(__file__)
+FRONTEND_DIR = os.path.join(BASE_DIR, "frontend")
+FRONTEND_INDEX = os.path.join(FRONTEND_DIR, "index.html")
+FRONTEND_INDEX_EXISTS = os.path.exists(FRONTEND_INDEX)
+# 历史记录中相对路径文件的查找目录
+RELATIVE_DOWNLOADS_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "downloads"))
+COOKIES_CONFIG_DIR = "/app/config" if IN_DOCKER else "config"
+COOKIES_FILE = os.path.join(COOKIES_CONFIG_DIR, "cookies.txt")
+# 启动时确保config目录存在，上传cookies时无需再检查
+os.makedirs(COOKIES_CONFIG_DIR, exist_ok=True)
+
 # Initialize downloader with Docker-compatible path
-download_dir = "/app/downloads" if os.path.exists("/app") else "downloads"
+download_dir = "/app/downloads" if IN_DOCKER else "downloads"
 downloader = YTDownloader(download_dir)
 
 # Initialize config
@@ -40,9 +100,16 @@ config = Config()
 
 # Initialize history manager
 history_manager = HistoryManager()
+# 下载器与接口共用同一份内存中的历史记录
+downloader.history_manager = history_manager
+
+
+@functools.cache
+def get_wecom_service():
+    """首次使用时才导入并初始化企业微信集成，缩短冷启动时间"""
+    from wecom import WeComService
+    return WeComService(config, downloader, history_manager)
 
-# Initialize WeCom integration
-wecom_service = WeComService(config, downloader, history_manager)
 
 # Initialize yt-dlp updater
 updater = YtDlpUpdater()
@@ -53,18 +120,69 @@ cookie_extractor = BrowserCookieExtractor(cookiecloud_config=config.get_cookiecl
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 下载结束后任务状态保留的时间（秒），保证前端轮询能读到最终状态
+FINISHED_TASK_RETENTION_SECONDS = 5
+
+# 字节单位表，按 bit_length()//10 直接索引（1024 = 2**10）
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+
+def format_bytes(num_bytes) -> Optional[str]:
+    """把字节数格式化为带单位的字符串，如 1536 -> 1.50 KB"""
+    if not num_bytes:
+        return None
+    unit = min(max((int(num_bytes).bit_length() - 1) // 10, 0), len(_SIZE_UNITS) - 1)
+    if unit == 0:
+        return f"{num_bytes:.0f} B"
+    return f"{num_bytes / (1 << (unit * 10)):.2f} {_SIZE_UNITS[unit]}"
+
+
+class VideoFileResponse(FileResponse):
+    """视频播放使用更大的读取块，减少线程切换与 send 调用次数"""
+    chunk_size = 4 * 1024 * 1024
+
+
+def _safe_stat(path: Optional[str]) -> Optional[os.stat_result]:
+    """对文件执行一次 stat，文件不存在或路径为空时返回 None"""
+    if not path:
+        return None
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
 
-# WebSocket connections
-active_connections: List[WebSocket] = []
+
+def _remove_file(file_path: str) -> bool:
+    """删除文件（在线程池中执行），文件不存在时返回 False"""
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _read_cookies_file() -> str:
+    """读取cookies文件内容（在线程池中执行）"""
+    try:
+        with open(COOKIES_FILE, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return ""
+
+
+def _write_cookies_file(content: str) -> None:
+    """写入cookies文件（在线程池中执行）"""
+    atomic_write(COOKIES_FILE, content.encode('utf-8'))
 
 
 @app.get("/")
 async def root():
     """返回主页面"""
     try:
-        frontend_path = os.path.join(os.path.dirname(__file__), "frontend", "index.html")
-        if os.path.exists(frontend_path):
-            return FileResponse(frontend_path)
+        if FRONTEND_INDEX_EXISTS:
+            return FileResponse(FRONTEND_INDEX)
         else:
             return {"message": "YouTube Downloader API", "version": "1.0.0", "error": "Frontend not found"}
     except Exception as e:
@@ -75,13 +193,13 @@ async def root():
 async def get_video_info(request: VideoInfoRequest):
     """获取视频信息"""
     try:
-        print(f"Fetching video info for URL: {request.url}")
+        logger.debug("Fetching video info for URL: %s", request.url)
         info = await downloader.get_video_info(request.url)
-        print(f"Video info fetched successfully: {info.get('title', 'Unknown')}")
+        logger.debug("Video info fetched successfully: %s", info.get('title', 'Unknown'))
         return VideoInfo(**info)
     except Exception as e:
-        print(f"Error in get_video_info: {str(e)}")
         error_msg = str(e)
+        logger.error("Error in get_video_info: %s", error_msg)
         if "Unsupported URL" in error_msg:
             error_msg = "不支持的URL格式，请确保输入正确的YouTube链接"
         elif "Video unavailable" in error_msg:
@@ -94,12 +212,15 @@ async def start_download(request: DownloadRequest):
     """开始下载视频"""
     try:
         # Generate task_id early
-        import uuid
         task_id = str(uuid.uuid4())
 
         # Set up 403/network error notification callback for Web downloads
         async def web_error_callback(task_id: str, url: str, status: str, retry_count: int = 0, final: bool = False, success: bool = False):
             """Handle 403 and network error notifications for Web downloads"""
+            admin_users = _admins_to_notify()
+            if not admin_users:
+                return
+
             # Get title from history or use a default
             entry = history_manager.get_entry(task_id)
             title = entry.get("title", "Unknown") if entry else "Unknown"
@@ -138,6 +259,8 @@ async def start_download(request: DownloadRequest):
                     error_message=error_msg
                 )
             else:
+                from wecom.message_templates import MessageTemplates
+
                 # Progress notification - use a specific status to indicate retry
                 clean_status = status.replace("[网络错误] ", "")
 
@@ -166,23 +289,19 @@ async def start_download(request: DownloadRequest):
                     )
 
                 # Send notification to admins
-                wecom_config = config.get_wecom_config()
-                if wecom_config.get("notify_admin", False) and wecom_service and wecom_service.client:
-                    admin_users = wecom_config.get("admin_users", [])
-                    for admin in admin_users:
-                        try:
-                            await wecom_service.client.send_news(
-                                title=notification['title'],
-                                description=notification['description'],
-                                url=notification['url'] or url,
-                                touser=admin
-                            )
-                            logger.info(f"403/network retry notification sent to admin {admin}")
-                        except Exception as e:
-                            logger.error(f"Failed to notify admin {admin}: {e}")
+                wecom_service = get_wecom_service()
+                if wecom_service.client:
+                    await send_news_to_admins(
+                        wecom_service.client,
+                        admin_users,
+                        "403/network retry notification",
+                        title=notification['title'],
+                        description=notification['description'],
+                        url=notification['url'] or url
+                    )
 
         # Get video info BEFORE starting download
-        info = await downloader.get_video_info(request.url)
+        info = await downloader.get_video_info(request.url, cache_for_download=True)
 
         # Add to history with correct info
         history_entry = {
@@ -204,19 +323,6 @@ async def start_download(request: DownloadRequest):
         # Start download with pre-assigned task_id
         actual_task_id = await downloader.download_video_with_id(request.url, task_id, request.format_id)
 
-        # Estimate file size like in WeComService
-        estimated_size = None
-        if info.get('formats'):
-            # Try to get file size from formats
-            for fmt in info['formats']:
-                if fmt.get('filesize') or fmt.get('filesize_approx'):
-                    size = fmt.get('filesize') or fmt.get('filesize_approx')
-                    if not estimated_size or size > estimated_size:
-                        estimated_size = size
-
-        if estimated_size:
-            info['estimated_filesize'] = estimated_size
-
         # Notify admins if enabled (Web downloads)
         await notify_wecom_admins(
             task_id=task_id,
@@ -228,7 +334,6 @@ async def start_download(request: DownloadRequest):
         )
 
         # Start monitoring task for completion
-        import asyncio
         asyncio.create_task(monitor_web_download(
             task_id=task_id,
             title=info.get("title", "Unknown"),
@@ -253,27 +358,7 @@ async def get_download_status(task_id: str):
 
     # Format speed
     speed = progress_info.get('speed', 0)
-    speed_str = None
-    if speed:
-        if speed > 1024 * 1024:
-            speed_str = f"{speed / 1024 / 1024:.2f} MB/s"
-        elif speed > 1024:
-            speed_str = f"{speed / 1024:.2f} KB/s"
-        else:
-            speed_str = f"{speed:.0f} B/s"
-
-    # Format sizes
-    def format_size(bytes_size):
-        if not bytes_size:
-            return None
-        if bytes_size > 1024 * 1024 * 1024:
-            return f"{bytes_size / 1024 / 1024 / 1024:.2f} GB"
-        elif bytes_size > 1024 * 1024:
-            return f"{bytes_size / 1024 / 1024:.2f} MB"
-        elif bytes_size > 1024:
-            return f"{bytes_size / 1024:.2f} KB"
-        else:
-            return f"{bytes_size} B"
+    speed_str = f"{format_bytes(speed)}/s" if speed else None
 
     response = {
         "task_id": task_id,
@@ -282,8 +367,8 @@ async def get_download_status(task_id: str):
         "speed": speed_str,
         "downloaded_bytes": progress_info.get('downloaded_bytes', 0),
         "total_bytes": progress_info.get('total_bytes', 0),
-        "downloaded_size": format_size(progress_info.get('downloaded_bytes', 0)),
-        "total_size": format_size(progress_info.get('total_bytes', 0)),
+        "downloaded_size": format_bytes(progress_info.get('downloaded_bytes', 0)),
+        "total_size": format_bytes(progress_info.get('total_bytes', 0)),
         "eta": progress_info.get('eta'),
         "filename": status.get('filename'),
         "message": status.get('error') if status.get('status') == 'error' else None,
@@ -297,8 +382,9 @@ async def get_download_status(task_id: str):
         updates = {'status': status.get('status')}
         if status.get('status') == 'completed':
             updates['file_path'] = status.get('filepath')
-            if status.get('filepath') and os.path.exists(status.get('filepath')):
-                updates['file_size'] = os.path.getsize(status.get('filepath'))
+            file_stat = _safe_stat(status.get('filepath'))
+            if file_stat:
+                updates['file_size'] = file_stat.st_size
         elif status.get('status') == 'error':
             updates['error_message'] = status.get('error', 'Unknown error')
         history_manager.update_entry(task_id, updates)
@@ -324,7 +410,7 @@ async def delete_history(task_id: str):
         if status and (status.get('status') == 'transcoding' or
                       (status.get('progress', {}).get('phase') == 'transcoding')):
             # Cancel the transcoding process and delete original file
-            print(f"Cancelling active transcoding for task {task_id}")
+            logger.info("Cancelling active transcoding for task %s", task_id)
             await downloader.transcoder.cancel_transcode(task_id, delete_input=True)
 
         # 删除文件
@@ -332,14 +418,13 @@ async def delete_history(task_id: str):
             file_path = entry_to_delete['file_path']
             # 如果是相对路径，转换为绝对路径
             if not os.path.isabs(file_path):
-                file_path = os.path.join(os.path.dirname(__file__), file_path.lstrip('/'))
+                file_path = os.path.join(BASE_DIR, file_path.lstrip('/'))
 
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    print(f"Deleted file: {file_path}")
-                except Exception as e:
-                    print(f"Error deleting file: {e}")
+            try:
+                if await asyncio.to_thread(_remove_file, file_path):
+                    logger.info("Deleted file: %s", file_path)
+            except Exception as e:
+                logger.error("Error deleting file: %s", e)
 
         # 从历史中删除
         history_manager.delete_entry(task_id)
@@ -371,14 +456,13 @@ async def redownload_video(task_id: str):
         file_path = entry['file_path']
         # 如果是相对路径，转换为绝对路径
         if not os.path.isabs(file_path):
-            file_path = os.path.join(os.path.dirname(__file__), file_path.lstrip('/'))
+            file_path = os.path.join(BASE_DIR, file_path.lstrip('/'))
 
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                print(f"Deleted old file for redownload: {file_path}")
-            except Exception as e:
-                print(f"Error deleting old file: {e}")
+        try:
+            if await asyncio.to_thread(_remove_file, file_path):
+                logger.info("Deleted old file for redownload: %s", file_path)
+        except Exception as e:
+            logger.error("Error deleting old file: %s", e)
 
     # 清理旧的下载任务
     downloader.cleanup_task(task_id)
@@ -389,11 +473,10 @@ async def redownload_video(task_id: str):
     # 开始新的下载
     try:
         # Generate new task_id
-        import uuid
         new_task_id = str(uuid.uuid4())
 
         # Get video info BEFORE starting download
-        info = await downloader.get_video_info(original_url)
+        info = await downloader.get_video_info(original_url, cache_for_download=True)
 
         # Add to history with correct info
         history_entry = {
@@ -413,7 +496,6 @@ async def redownload_video(task_id: str):
         actual_task_id = await downloader.download_video_with_id(original_url, new_task_id)
 
         # Start monitoring task for completion
-        import asyncio
         asyncio.create_task(monitor_web_download(
             task_id=new_task_id,
             title=info.get("title", "Unknown"),
@@ -429,134 +511,137 @@ async def redownload_video(task_id: str):
 @app.get("/api/proxy-thumbnail")
 async def proxy_thumbnail(url: str):
     """代理YouTube缩略图"""
+    client = get_thumbnail_client()
+    response = None
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-
-            # 获取内容类型
-            content_type = response.headers.get("content-type", "image/jpeg")
-
-            return StreamingResponse(
-                iter([response.content]),
-                media_type=content_type,
-                headers={
-                    "Cache-Control": "public, max-age=3600",
-                    "Access-Control-Allow-Origin": "*"
-                }
-            )
+        # 以流式方式请求，收到上游数据后立即转发给客户端，而不是整体缓存到内存
+        response = await client.send(client.build_request("GET", url), stream=True)
+        response.raise_for_status()
     except Exception as e:
-        logger.error(f"Error proxying thumbnail {url}: {e}")
+        if response is not None:
+            await response.aclose()
+        logger.error("Error proxying thumbnail %s: %s", url, e)
         raise HTTPException(status_code=404, detail="Unable to fetch thumbnail")
 
+    # 获取内容类型
+    content_type = response.headers.get("content-type", "image/jpeg")
+
+    return StreamingResponse(
+        response.aiter_bytes(chunk_size=65536),
+        media_type=content_type,
+        headers={
+            "Cache-Control": "public, max-age=3600",
+            "Access-Control-Allow-Origin": "*"
+        },
+        # 响应体发送完毕后释放上游连接回连接池
+        background=BackgroundTask(response.aclose)
+    )
+
+
+def _snapshot_active_tasks() -> List[dict]:
+    """汇总所有下载任务的当前进度"""
+    return [
+        {
+            "task_id": task_id,
+            "status": status.get('status'),
+            "progress": status.get('progress', {}).get('percent', 0)
+        }
+        for task_id, status in list(downloader.active_downloads.items())
+    ]
+
+
+async def send_ws_json(websocket: WebSocket, data) -> None:
+    """用 orjson 序列化后以文本帧发送，浏览器端仍可直接 JSON.parse"""
+    await websocket.send_text(orjson.dumps(data).decode())
+
+
+async def forward_progress(websocket: WebSocket, queue: asyncio.Queue) -> None:
+    """把下载器发布的单个任务进度事件逐条推送给客户端"""
+    while True:
+        event = await queue.get()
+        await send_ws_json(websocket, event)
+
 
 @app.websocket("/ws/progress")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket连接用于实时进度更新"""
+    """WebSocket连接用于实时进度更新（订阅下载器的进度事件）"""
     await websocket.accept()
-    active_connections.append(websocket)
+    queue = downloader.subscribe_progress()
 
     try:
-        while True:
-            # Wait for any message from client
-            data = await websocket.receive_text()
-
-            # Send current status of all active downloads
-            active_tasks = []
-            for task_id, status in downloader.active_downloads.items():
-                progress_info = status.get('progress', {})
-                active_tasks.append({
-                    "task_id": task_id,
-                    "status": status.get('status'),
-                    "progress": progress_info.get('percent', 0)
-                })
-
-            await websocket.send_json({"active_tasks": active_tasks})
+        # 连接建立后立即发送一次完整状态，之后只推送变化的任务
+        await send_ws_json(websocket, {"active_tasks": _snapshot_active_tasks()})
+        sender = asyncio.create_task(forward_progress(websocket, queue))
+        try:
+            while True:
+                # 仅用于检测客户端断开，客户端消息不再触发单独的状态回复
+                await websocket.receive_text()
+        finally:
+            sender.cancel()
+            # 取回发送任务的结果（取消或发送异常），避免“异常未被获取”的警告
+            await asyncio.gather(sender, return_exceptions=True)
     except Exception:
         pass
     finally:
-        active_connections.remove(websocket)
+        downloader.unsubscribe_progress(queue)
 
 
-@app.get("/api/download-file/{task_id}")
-async def download_file(task_id: str):
-    """下载文件到客户端"""
-    # 首先尝试从active downloads获取
+def _resolve_task_filepath(task_id: str) -> Optional[str]:
+    """查找任务文件路径：先查已完成的活动任务，再查历史记录，相对路径转换为下载目录下的绝对路径"""
+    filepath = None
     status = downloader.get_download_status(task_id)
-
     if status and status.get('status') == 'completed':
         filepath = status.get('filepath')
-    else:
-        # 如果不在active downloads，从历史记录中查找
-        filepath = None
+
+    if not filepath:
         entry = history_manager.get_entry(task_id)
         if entry:
             filepath = entry.get('file_path')
 
-        if not filepath:
-            raise HTTPException(status_code=404, detail="File not found in history")
+    if filepath and not os.path.isabs(filepath):
+        filepath = os.path.join(RELATIVE_DOWNLOADS_DIR, os.path.basename(filepath))
+    return filepath
 
-    # 处理文件路径
-    if not os.path.isabs(filepath):
-        # 如果是相对路径，转换为绝对路径
-        filepath = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "downloads", os.path.basename(filepath)))
 
-    if not os.path.exists(filepath):
+@app.get("/api/download-file/{task_id}")
+async def download_file(task_id: str):
+    """下载文件到客户端"""
+    filepath = _resolve_task_filepath(task_id)
+    if not filepath:
+        raise HTTPException(status_code=404, detail="File not found in history")
+
+    file_stat = _safe_stat(filepath)
+    if not file_stat:
         raise HTTPException(status_code=404, detail=f"File not found: {filepath}")
 
     return FileResponse(
         path=filepath,
         filename=os.path.basename(filepath),
-        media_type='application/octet-stream'
+        media_type='application/octet-stream',
+        stat_result=file_stat
     )
 
 
 @app.get("/api/stream/{task_id}")
 async def stream_video(task_id: str):
     """流式播放视频"""
-    # 查找文件路径
-    filepath = None
-
-    # 从active downloads查找
-    status = downloader.get_download_status(task_id)
-    if status and status.get('status') == 'completed':
-        filepath = status.get('filepath')
-
-    # 从历史记录中查找
-    if not filepath:
-        entry = history_manager.get_entry(task_id)
-        if entry:
-            filepath = entry.get('file_path')
-
+    filepath = _resolve_task_filepath(task_id)
     if not filepath:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    # 处理文件路径
-    if not os.path.isabs(filepath):
-        filepath = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "downloads", os.path.basename(filepath)))
-
-    if not os.path.exists(filepath):
+    file_stat = _safe_stat(filepath)
+    if not file_stat:
         raise HTTPException(status_code=404, detail=f"Video file not found: {filepath}")
 
-    # 获取文件大小
-    file_size = os.path.getsize(filepath)
-
-    def iterfile():
-        with open(filepath, 'rb') as f:
-            while chunk := f.read(1024 * 1024):  # 1MB chunks
-                yield chunk
-
     # 根据文件扩展名设置正确的媒体类型
     ext = os.path.splitext(filepath)[1].lower()
     media_type = 'video/mp4' if ext == '.mp4' else 'video/webm' if ext == '.webm' else 'application/octet-stream'
 
-    return StreamingResponse(
-        iterfile(),
+    # FileResponse 自行处理 Content-Length、Accept-Ranges 以及 Range 请求（视频拖动）
+    return VideoFileResponse(
+        path=filepath,
         media_type=media_type,
-        headers={
-            "Content-Length": str(file_size),
-            "Accept-Ranges": "bytes",
-        }
+        stat_result=file_stat
     )
 
 
@@ -569,8 +654,6 @@ async def get_config():
 @app.get("/api/version")
 async def get_version():
     """获取版本信息"""
-    import yt_dlp
-    import sys
     return {
         "app_version": __version__,
         "yt_dlp_version": yt_dlp.version.__version__,
@@ -652,12 +735,11 @@ async def get_browser_cookie_status():
     browser_config = config.config.get('browser_cookies', {})
 
     # Check if cookies exist
-    cookies_exist = os.path.exists(cookie_extractor.cookies_file)
+    cookies_exist = cookie_extractor.cookies_file_exists()
     cookies_fresh = False
     cookies_age = None
 
     if cookies_exist and cookie_extractor.last_extraction_time:
-        from datetime import datetime
         age = datetime.now() - cookie_extractor.last_extraction_time
         cookies_age = str(age)
         cookies_fresh = age.total_seconds() < (25 * 60)  # Less than 25 minutes
@@ -715,7 +797,7 @@ async def update_config(updates: dict):
 @app.get("/api/wecom/config")
 async def get_wecom_config():
     """获取企业微信集成配置"""
-    return config.get_wecom_config()
+    return dict(config.get_wecom_config())
 
 
 @app.post("/api/wecom/config")
@@ -735,103 +817,124 @@ async def update_wecom_config(updates: dict):
     if encoding_key and len(encoding_key) != 43:
         raise HTTPException(status_code=400, detail="EncodingAESKey 必须为43位")
 
-    current = config.get_wecom_config()
-    current.update(clean_updates)
+    current = {**config.get_wecom_config(), **clean_updates}
 
     if not config.update_config({"wecom": current}):
         raise HTTPException(status_code=500, detail="保存配置失败")
 
-    wecom_service.reload_config()
+    get_wecom_service().reload_config()
     return {"message": "WeCom config updated"}
 
 
 async def monitor_web_download(task_id: str, title: str, url: str, video_info: dict) -> None:
     """Monitor Web download task and send completion/error notifications"""
-    import asyncio
-
     try:
-        while True:
-            await asyncio.sleep(5)
-            status = downloader.get_download_status(task_id)
-
-            if not status:
-                continue
-
-            current = status.get("status")
-
-            if current == "completed":
-                # Get actual file size if available
-                filepath = status.get("filepath")
-                if filepath and os.path.exists(filepath):
-                    try:
-                        actual_size = os.path.getsize(filepath)
-                        video_info['filesize'] = actual_size
-                    except:
-                        pass
-
-                # Get actual video info from downloader if available
-                if status.get('video_info'):
-                    actual_info = status.get('video_info')
-                    # Update with real title and info from download
-                    history_manager.update_entry(task_id, {
-                        "status": "completed",
-                        "title": actual_info.get('title', title),
-                        "thumbnail": actual_info.get('thumbnail'),
-                        "uploader": actual_info.get('uploader'),
-                        "file_path": filepath,
-                        "file_size": actual_info.get('filesize') or video_info.get('filesize')
-                    })
-                else:
-                    # Fallback to original update
-                    history_manager.update_entry(task_id, {
-                        "status": "completed",
-                        "file_path": filepath,
-                        "file_size": video_info.get('filesize')
-                    })
-
-                # Generate download link for admins
-                wecom_config = config.get_wecom_config()
-                public_url = wecom_config.get("public_base_url", "").rstrip("/")
-                download_link = f"{public_url}/api/download-file/{task_id}" if public_url else None
-
-                # Notify admins of completion with download link
-                await notify_wecom_admins(
-                    task_id=task_id,
-                    title=title,
-                    url=url,
-                    source="Web",
-                    video_info=video_info,
-                    status="completed",
-                    download_link=download_link
-                )
-                break
-
-            elif current == "error":
-                error_msg = status.get("error", "未知错误")
-
-                # Update history
+        # 等待下载线程结束（完成或失败），不再定时轮询
+        status = await downloader.wait_for_completion(task_id)
+
+        if not status:
+            # 任务已被清理（例如历史记录被删除）
+            return
+
+        current = status.get("status")
+
+        if current == "completed":
+            # Get actual file size if available
+            filepath = status.get("filepath")
+            file_stat = _safe_stat(filepath)
+            if file_stat:
+                video_info['filesize'] = file_stat.st_size
+
+            # Get actual video info from downloader if available
+            if status.get('video_info'):
+                actual_info = status.get('video_info')
+                # Update with real title and info from download
+                history_manager.update_entry(task_id, {
+                    "status": "completed",
+                    "title": actual_info.get('title', title),
+                    "thumbnail": actual_info.get('thumbnail'),
+                    "uploader": actual_info.get('uploader'),
+                    "file_path": filepath,
+                    "file_size": actual_info.get('filesize') or video_info.get('filesize')
+                })
+            else:
+                # Fallback to original update
                 history_manager.update_entry(task_id, {
-                    "status": "error",
-                    "error_message": error_msg
+                    "status": "completed",
+                    "file_path": filepath,
+                    "file_size": video_info.get('filesize')
                 })
 
-                # Notify admins of error
-                await notify_wecom_admins(
-                    task_id=task_id,
-                    title=title,
-                    url=url,
-                    source="Web",
-                    video_info=video_info,
-                    status="error",
-                    error_message=error_msg
-                )
-                break
+            # Generate download link for admins
+            wecom_config = config.get_wecom_config()
+            public_url = wecom_config.get("public_base_url", "").rstrip("/")
+            download_link = f"{public_url}/api/download-file/{task_id}" if public_url else None
+
+            # Notify admins of completion with download link
+            await notify_wecom_admins(
+                task_id=task_id,
+                title=title,
+                url=url,
+                source="Web",
+                video_info=video_info,
+                status="completed",
+                download_link=download_link
+            )
+
+        elif current == "error":
+            error_msg = status.get("error", "未知错误")
+
+            # Update history
+            history_manager.update_entry(task_id, {
+                "status": "error",
+                "error_message": error_msg
+            })
+
+            # Notify admins of error
+            await notify_wecom_admins(
+                task_id=task_id,
+                title=title,
+                url=url,
+                source="Web",
+                video_info=video_info,
+                status="error",
+                error_message=error_msg
+            )
 
     except Exception as e:
-        logger.error(f"Error monitoring web download {task_id}: {e}")
+        logger.error("Error monitoring web download %s: %s", task_id, e)
     finally:
-        # Clean up task
-        downloader.cleanup_task(task_id)
+        # Clean up task after a grace period so status pollers can still see the final state
+        asyncio.get_running_loop().call_later(
+            FINISHED_TASK_RETENTION_SECONDS, downloader.cleanup_task, task_id
+        )
+
+
+async def send_news_to_admins(client, admin_users: Sequence[str], label: str, **news) -> None:
+    """并发地向所有管理员发送同一条图文消息，总耗时取决于最慢的一次请求"""
+    # 先取得 access token，避免并发请求在 token 锁上排队
+    try:
+        await client.ensure_token()
+    except Exception as e:
+        logger.warning("Could not prefetch WeCom access token: %s", e)
+    results = await asyncio.gather(
+        *(client.send_news(touser=admin, **news) for admin in admin_users),
+        return_exceptions=True
+    )
+    for admin, result in zip(admin_users, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to notify admin %s: %s", admin, result)
+        else:
+            logger.info("%s sent to admin %s", label, admin)
+
+
+def _admins_to_notify(wecom_config: Optional[Mapping] = None) -> Sequence[str]:
+    """返回需要通知的管理员列表，未开启管理员通知时返回空列表"""
+    if wecom_config is None:
+        wecom_config = config.get_wecom_config()
+    if not wecom_config.get("notify_admin", False):
+        return []
+    return wecom_config.get("admin_users", ())
 
 
 async def notify_wecom_admins(
@@ -845,15 +948,23 @@ async def notify_wecom_admins(
     download_link: str = None
 ) -> None:
     """Notify admin users about download tasks from Web interface"""
+    # 未开启通知时直接返回，不做任何格式化工作
     wecom_config = config.get_wecom_config()
-
-    if not wecom_config.get("notify_admin", False):
-        return
-
-    admin_users = wecom_config.get("admin_users", [])
+    admin_users = _admins_to_notify(wecom_config)
     if not admin_users:
         return
 
+    # Estimate file size like in WeComService; stored on video_info so the
+    # completion notification for the same task can reuse it.
+    # get_video_info 已将 filesize_approx 合并到 filesize 中
+    if video_info and 'estimated_filesize' not in video_info:
+        estimated_size = max(
+            (fmt.get('filesize') or 0 for fmt in video_info.get('formats') or ()),
+            default=0
+        )
+        if estimated_size:
+            video_info['estimated_filesize'] = estimated_size
+
     # Map status to our unified template format
     template_status = 'start'
     if status == "completed":
@@ -861,6 +972,8 @@ async def notify_wecom_admins(
     elif status == "error":
         template_status = 'error'
 
+    from wecom.message_templates import MessageTemplates
+
     # Format file size if available
     file_size_text = None
     if video_info:
@@ -868,13 +981,8 @@ async def notify_wecom_admins(
                     video_info.get("filesize_approx") or
                     video_info.get("estimated_filesize"))
 
-        if isinstance(file_size, (int, float)) and file_size > 0:
-            size_mb = file_size / (1024 * 1024)
-            if size_mb >= 1024:
-                file_size_text = f"{size_mb/1024:.1f} GB"
-            else:
-                file_size_text = f"{size_mb:.1f} MB"
-
+        file_size_text = MessageTemplates.format_file_size(file_size)
+        if file_size_text:
             if video_info.get("estimated_filesize") and not video_info.get("filesize"):
                 file_size_text += " (预估)"
 
@@ -896,43 +1004,39 @@ async def notify_wecom_admins(
     if video_info and video_info.get("thumbnail"):
         public_url = wecom_config.get("public_base_url", "").rstrip("/")
         if public_url:
-            import urllib.parse
-            encoded_thumbnail = urllib.parse.quote(video_info["thumbnail"], safe='')
-            picurl = f"{public_url}/api/proxy-thumbnail?url={encoded_thumbnail}"
+            picurl = MessageTemplates.proxy_thumbnail_url(public_url, video_info["thumbnail"])
 
     # Send notification to all admins using news format
-    if wecom_service and wecom_service.client:
-        for admin in admin_users:
-            try:
-                # Use news format for better presentation
-                await wecom_service.client.send_news(
-                    title=notification['title'],
-                    description=notification['description'],
-                    picurl=picurl,
-                    url=notification['url'] or url,
-                    touser=admin
-                )
-                logger.info(f"Admin notification sent to {admin} for task {task_id} (status: {status})")
-            except Exception as e:
-                logger.error(f"Failed to notify admin {admin}: {e}")
+    wecom_service = get_wecom_service()
+    if wecom_service.client:
+        # Use news format for better presentation
+        await send_news_to_admins(
+            wecom_service.client,
+            admin_users,
+            f"Admin notification for task {task_id} (status: {status})",
+            title=notification['title'],
+            description=notification['description'],
+            picurl=picurl,
+            url=notification['url'] or url
+        )
 
 
 @app.post("/api/wecom/test-admin")
 async def test_admin_notification():
     """Test admin notification"""
-    if not wecom_service:
-        raise HTTPException(status_code=503, detail="WeChat Work service is not configured")
+    # get_wecom_service() 总会返回实例，未配置的情况由下方 client 检查给出提示
+    wecom_service = get_wecom_service()
 
     # Reload config to get latest admin settings
     wecom_service.reload_config()
 
     success = await wecom_service.send_admin_test()
+    # reload_config 刚刷新过服务持有的配置视图，直接复用
+    admin_users = wecom_service.wecom_config.get("admin_users", [])
 
     if success:
-        admin_users = config.get_wecom_config().get("admin_users", [])
         return {"success": True, "message": f"测试通知已发送给 {len(admin_users)} 个管理员"}
     else:
-        admin_users = config.get_wecom_config().get("admin_users", [])
         if not admin_users:
             return {"success": False, "message": "请先配置管理员用户ID"}
         elif not wecom_service.client:
@@ -949,7 +1053,7 @@ async def wecom_verify(
     echostr: str,
 ):
     """企业微信回调URL验证"""
-    echo = wecom_service.verify_url(msg_signature, timestamp, nonce, echostr)
+    echo = get_wecom_service().verify_url(msg_signature, timestamp, nonce, echostr)
     return PlainTextResponse(echo)
 
 
@@ -962,7 +1066,7 @@ async def wecom_callback(
 ):
     """企业微信消息回调处理"""
     body = (await request.body()).decode("utf-8")
-    response_text = await wecom_service.handle_callback(
+    response_text = await get_wecom_service().handle_callback(
         msg_signature,
         timestamp,
         nonce,
@@ -975,16 +1079,10 @@ async def wecom_callback(
 async def get_cookies():
     """获取cookies内容"""
     try:
-        # Use Docker-compatible path
-        cookies_file = "/app/config/cookies.txt" if os.path.exists("/app") else os.path.join("config", "cookies.txt")
-        if os.path.exists(cookies_file):
-            with open(cookies_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return {"content": content}
-        else:
-            return {"content": ""}
+        content = await asyncio.to_thread(_read_cookies_file)
+        return {"content": content}
     except Exception as e:
-        logger.error(f"Error getting cookies: {e}")
+        logger.error("Error getting cookies: %s", e)
         return {"content": ""}
 
 @app.post("/api/config/cookies")
@@ -995,22 +1093,11 @@ async def upload_cookies(data: dict):
         if not content:
             raise HTTPException(status_code=400, detail="No cookies content provided")
 
-        # Use Docker-compatible path
-        if os.path.exists("/app"):
-            cookies_file = "/app/config/cookies.txt"
-            config_dir = "/app/config"
-        else:
-            cookies_file = os.path.join("config", "cookies.txt")
-            config_dir = "config"
-
-        # 确保config目录存在
-        os.makedirs(config_dir, exist_ok=True)
+        await asyncio.to_thread(_write_cookies_file, content)
 
-        with open(cookies_file, 'w', encoding='utf-8') as f:
-            f.write(content)
-
-        # 重新加载下载器配置以应用新的cookies
-        downloader.config = Config()
+        # 重新加载下载器配置以应用新的cookies（配置文件未变化时复用缓存）
+        config.reload()
+        downloader.config = config
 
         return {"message": "Cookies uploaded successfully"}
     except Exception as e:
@@ -1024,7 +1111,7 @@ async def get_cookiecloud_status():
 
     # Test connection if configured
     if cookiecloud_config.get('enabled'):
-        success, message = cookie_extractor.test_cookiecloud_connection()
+        success, message = await asyncio.to_thread(cookie_extractor.test_cookiecloud_connection)
         return {
             "enabled": True,
             "configured": bool(cookiecloud_config.get('server_url')),
@@ -1049,11 +1136,12 @@ async def get_cookiecloud_status():
 @app.post("/api/cookiecloud/sync")
 async def sync_cookiecloud():
     """手动触发CookieCloud同步"""
-    success, message = cookie_extractor.sync_cookiecloud()
+    success, message = await asyncio.to_thread(cookie_extractor.sync_cookiecloud)
 
     if success:
-        # 重新加载下载器配置以应用新的cookies
-        downloader.config = Config()
+        # 重新加载下载器配置以应用新的cookies（配置文件未变化时复用缓存）
+        config.reload()
+        downloader.config = config
         return {"success": True, "message": message}
     else:
         raise HTTPException(status_code=500, detail=message)
@@ -1075,13 +1163,12 @@ async def update_cookiecloud_config(data: dict):
             }
         })
 
-        # Re-initialize cookie extractor with new config
-        global cookie_extractor
-        cookie_extractor = BrowserCookieExtractor(cookiecloud_config=config.get_cookiecloud_config())
+        # 仅更新CookieCloud设置，保留已缓存的cookies；连接参数变化时才重建客户端
+        cookie_extractor.update_cookiecloud_config(config.get_cookiecloud_config())
 
         # Test connection if enabled
         if data.get('enabled'):
-            success, message = cookie_extractor.test_cookiecloud_connection()
+            success, message = await asyncio.to_thread(cookie_extractor.test_cookiecloud_connection)
             return {
                 "message": "Configuration updated",
                 "connection_test": {
@@ -1099,8 +1186,6 @@ async def update_cookiecloud_config(data: dict):
 @app.post("/api/cookiecloud/test")
 async def test_cookiecloud_connection(data: dict):
     """测试CookieCloud连接"""
-    from ytb.cookiecloud import CookieCloud
-
     # Create temporary CookieCloud instance for testing
     test_config = {
         'server_url': data.get('server_url', ''),
@@ -1109,7 +1194,7 @@ async def test_cookiecloud_connection(data: dict):
     }
 
     cookiecloud = CookieCloud(test_config)
-    success, message = cookiecloud.test_connection()
+    success, message = await asyncio.to_thread(cookiecloud.test_connection)
 
     return {
         "success": success,
@@ -1117,12 +1202,11 @@ async def test_cookiecloud_connection(data: dict):
     }
 
 # Serve frontend static files
-frontend_dir = os.path.join(os.path.dirname(__file__), "frontend")
-if os.path.exists(frontend_dir):
-    app.mount("/static", StaticFiles(directory=frontend_dir), name="static")
+if os.path.exists(FRONTEND_DIR):
+    app.mount("/static", StaticFiles(directory=FRONTEND_DIR), name="static")
     # Also serve CSS and JS files directly
-    css_dir = os.path.join(frontend_dir, "css")
-    js_dir = os.path.join(frontend_dir, "js")
+    css_dir = os.path.join(FRONTEND_DIR, "css")
+    js_dir = os.path.join(FRONTEND_DIR, "js")
     if os.path.exists(css_dir):
         app.mount("/css", StaticFiles(directory=css_dir), name="css")
     if os.path.exists(js_dir):
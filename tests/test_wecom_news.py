@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+from wecom.service import NEWS_COALESCE_DELAY, WeComService
+
+
+class _Config:
+    def get_wecom_config(self):
+        return {}
+
+
+class _Downloader:
+    app_loop = None
+
+
+class _Client:
+    def __init__(self):
+        self.sent = []
+        self.loops = []
+
+    async def send_news_articles(self, articles, touser=None):
+        self.loops.append(asyncio.get_running_loop())
+        self.sent.append((touser, [article["title"] for article in articles]))
+
+
+def _make_service(app_loop):
+    downloader = _Downloader()
+    downloader.app_loop = app_loop
+    service = WeComService(_Config(), downloader, None)
+    service.client = _Client()
+    return service
+
+
+def _enqueue_on_temporary_loop(service, touser, title):
+    """Enqueue the way a download thread does: on a new loop that is closed afterwards."""
+    def run():
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(service._enqueue_news(touser, {"title": title}, title))
+        finally:
+            loop.close()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+
+
+def test_off_loop_news_is_flushed_on_app_loop():
+    async def main():
+        app_loop = asyncio.get_running_loop()
+        service = _make_service(app_loop)
+
+        await asyncio.to_thread(_enqueue_on_temporary_loop, service, "alice", "first")
+        await asyncio.sleep(NEWS_COALESCE_DELAY * 3)
+        # A later card for the same user must not be stuck behind a dead flusher
+        await service._enqueue_news("alice", {"title": "second"}, "second")
+        await asyncio.sleep(NEWS_COALESCE_DELAY * 3)
+
+        assert service.client.sent == [("alice", ["first"]), ("alice", ["second"])]
+        assert all(loop is app_loop for loop in service.client.loops)
+        assert not service._news_flushers
+        assert not service._pending_news
+
+    asyncio.run(main())
+
+
+def test_off_loop_news_without_running_app_loop_is_sent_directly():
+    stopped_loop = asyncio.new_event_loop()
+    stopped_loop.close()
+    service = _make_service(stopped_loop)
+
+    _enqueue_on_temporary_loop(service, "bob", "only")
+
+    assert service.client.sent == [("bob", ["only"])]
+    assert not service._news_flushers
+    assert not service._pending_news
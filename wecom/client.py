@@ -1,12 +1,20 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import os
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import httpx
+import orjson
+
+from ytb.config import atomic_write
+
+# Upper bound on in-flight WeCom API requests per client (keeps fan-out under the API QPS limit)
+MAX_CONCURRENT_REQUESTS = 10
+# WeCom accepts at most this many articles in one news message
+MAX_NEWS_ARTICLES = 8
+
 
 class WeComAPIError(Exception):
     """Raised when WeCom API returns an error."""
@@ -17,8 +25,13 @@ class WeComClient:
         self.config = config
         self._access_token: Optional[str] = None
         self._expires_at: float = 0.0
-        self._lock = asyncio.Lock()
         self._base_url = self._get_base_url()
+        # The token lock, request slots and keep-alive pool belong to the event loop
+        # that first uses the client; they are created by _on_owner_loop()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._request_slots: Optional[asyncio.Semaphore] = None
+        self._http: Optional[httpx.AsyncClient] = None
 
     def _get_base_url(self) -> str:
         proxy_domain = self.config.get("proxy_domain", "").strip()
@@ -36,8 +49,8 @@ class WeComClient:
         cache_file = self._get_cache_file_path()
         try:
             if os.path.exists(cache_file):
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                with open(cache_file, 'rb') as f:
+                    data = orjson.loads(f.read())
                     if data.get("expires_at", 0) > time.time() + 60:
                         return data
         except Exception:
@@ -52,37 +65,88 @@ class WeComClient:
                 "expires_at": expires_at,
                 "cached_at": time.time()
             }
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, indent=2)
+            # Compact JSON swapped in atomically so a crash never leaves a torn cache
+            atomic_write(cache_file, orjson.dumps(cache_data))
         except Exception:
             pass
 
+    def _on_owner_loop(self) -> bool:
+        """Bind the loop-affine state to the first (or a replacement for a closed) loop.
+
+        Returns False when running on any other loop, e.g. a download thread's
+        temporary loop; such callers must not touch the shared primitives.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return True
+        if self._loop is not None and not self._loop.is_closed():
+            return False
+        self._loop = loop
+        self._lock = asyncio.Lock()
+        self._request_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        # A pool left over from a closed loop cannot be reused or closed
+        self._http = None
+        return True
+
+    def _get_http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=10.0,
+                limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+            )
+        return self._http
+
+    async def close(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
     async def _request(self, method: str, url: str, **kwargs: Any) -> Dict[str, Any]:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.request(method, url, **kwargs)
-            response.raise_for_status()
-            data = response.json()
+        if self._on_owner_loop():
+            async with self._request_slots:
+                response = await self._get_http().request(method, url, **kwargs)
+        else:
+            # Pooled connections cannot be used from another event loop, so use a one-off client
+            async with httpx.AsyncClient(timeout=10.0) as one_off:
+                response = await one_off.request(method, url, **kwargs)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
         if data.get("errcode") not in (0, None):
             raise WeComAPIError(data.get("errmsg", "Unknown WeCom API error"))
         return data
 
+    async def ensure_token(self) -> None:
+        """Warm the access token so a burst of concurrent sends skips the token lock."""
+        await self._get_access_token()
+
+    def _token_is_fresh(self, now: float) -> bool:
+        return bool(self._access_token) and now < self._expires_at - 60
+
     async def _get_access_token(self) -> str:
         if not self._is_configured():
             raise WeComAPIError("WeCom credentials are not configured")
 
-        async with self._lock:
+        # Fast path: a valid in-memory token needs neither the lock nor disk
+        if self._token_is_fresh(time.time()):
+            return self._access_token
+
+        # Off the owner loop a private lock keeps the shared one unbound to that loop
+        lock = self._lock if self._on_owner_loop() else asyncio.Lock()
+        async with lock:
             now = time.time()
 
-            # Check memory cache first
-            if self._access_token and now < self._expires_at - 60:
+            # Another caller may have refreshed the token while we waited
+            if self._token_is_fresh(now):
                 return self._access_token
 
-            # Check persistent cache
-            cached_data = self._load_cached_token()
-            if cached_data:
-                self._access_token = cached_data.get("access_token")
-                self._expires_at = cached_data.get("expires_at")
-                return self._access_token
+            # The persistent cache is only consulted before the first token is known
+            if self._expires_at == 0.0:
+                cached_data = await asyncio.to_thread(self._load_cached_token)
+                if cached_data:
+                    self._access_token = cached_data.get("access_token")
+                    self._expires_at = cached_data.get("expires_at")
+                    if self._token_is_fresh(now):
+                        return self._access_token
 
             # Fetch new token from API
             params = {
@@ -99,7 +163,7 @@ class WeComClient:
             self._expires_at = now + expires_in
 
             # Save to persistent cache
-            self._save_cached_token(self._access_token, self._expires_at)
+            await asyncio.to_thread(self._save_cached_token, self._access_token, self._expires_at)
 
             return self._access_token
 
@@ -114,8 +178,6 @@ class WeComClient:
         totag: Optional[str] = None,
         chatid: Optional[str] = None,
     ) -> None:
-        token = await self._get_access_token()
-
         article = {
             "title": title,
             "description": description,
@@ -126,13 +188,31 @@ class WeComClient:
         if url:
             article["url"] = url
 
+        await self.send_news_articles(
+            [article], touser=touser, toparty=toparty, totag=totag, chatid=chatid
+        )
+
+    async def send_news_articles(
+        self,
+        articles: List[Dict[str, Any]],
+        touser: Optional[str] = None,
+        toparty: Optional[str] = None,
+        totag: Optional[str] = None,
+        chatid: Optional[str] = None,
+    ) -> None:
+        """Send one news message carrying up to ``MAX_NEWS_ARTICLES`` articles."""
+        if not 0 < len(articles) <= MAX_NEWS_ARTICLES:
+            raise ValueError(f"news message needs 1-{MAX_NEWS_ARTICLES} articles, got {len(articles)}")
+
+        token = await self._get_access_token()
+
         if chatid:
             api_url = f"{self._base_url}/cgi-bin/appchat/send"
             payload = {
                 "chatid": chatid,
                 "msgtype": "news",
                 "news": {
-                    "articles": [article]
+                    "articles": articles
                 },
                 "safe": 0,
             }
@@ -142,7 +222,7 @@ class WeComClient:
                 "msgtype": "news",
                 "agentid": self.config.get("agent_id"),
                 "news": {
-                    "articles": [article]
+                    "articles": articles
                 },
                 "safe": 0,
             }
@@ -202,10 +282,8 @@ class WeComClient:
         )
 
     def _is_configured(self) -> bool:
-        return all(
-            [
-                self.config.get("corp_id"),
-                self.config.get("agent_id") is not None,
-                self.config.get("app_secret"),
-            ]
+        return (
+            bool(self.config.get("corp_id"))
+            and self.config.get("agent_id") is not None
+            and bool(self.config.get("app_secret"))
         )
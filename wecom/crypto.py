@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import base64
+import bisect
+import functools
 import hashlib
+import hmac
 import os
 import struct
 from dataclasses import dataclass
@@ -26,24 +29,28 @@ class WeComCrypto:
         if len(self.aes_key) != 32:
             raise WeComCryptoError("Invalid AES key length; expected 256-bit key")
         self.iv = self.aes_key[:16]
+        # CBC objects are single-use, but key, mode and IV never change per instance
+        self._new_cipher = functools.partial(AES.new, self.aes_key, AES.MODE_CBC, self.iv)
+        self._corp_id_bytes = self.corp_id.encode()
+        self._token_bytes = self.token.encode()
 
     def verify_signature(self, signature: str, timestamp: str, nonce: str, encrypt: str) -> None:
         """Validate SHA1 signature using the known token."""
         expected = self._sha1(timestamp, nonce, encrypt)
-        if expected != signature:
+        # Compare as bytes: compare_digest rejects non-ASCII str input
+        if not hmac.compare_digest(expected.encode(), signature.encode()):
             raise WeComCryptoError("Signature verification failed")
 
     def decrypt(self, encrypt: str) -> Tuple[str, str]:
         """Decrypt encrypted message and return (xml, receive_id)."""
-        cipher = AES.new(self.aes_key, AES.MODE_CBC, self.iv)
-        padded = cipher.decrypt(base64.b64decode(encrypt))
+        padded = self._new_cipher().decrypt(base64.b64decode(encrypt))
         plaintext = self._pkcs7_unpad(padded)
 
-        # Skip the random 16 bytes
-        content = plaintext[16:]
-        xml_length = struct.unpack(">I", content[:4])[0]
-        xml_data = content[4:4 + xml_length]
-        receive_id = content[4 + xml_length:].decode()
+        # Skip the random 16 bytes and read the length prefix in place
+        xml_length = struct.unpack_from(">I", plaintext, 16)[0]
+        xml_end = 20 + xml_length
+        xml_data = plaintext[20:xml_end]
+        receive_id = plaintext[xml_end:].decode()
         if receive_id != self.corp_id:
             raise WeComCryptoError("Receiver corp id mismatch")
         return xml_data.decode(), receive_id
@@ -51,13 +58,19 @@ class WeComCrypto:
     def encrypt(self, xml: str, timestamp: str, nonce: str) -> dict:
         """Encrypt reply XML and build response payload."""
         xml_bytes = xml.encode()
-        random_bytes = os.urandom(16)
-        packed_length = struct.pack(">I", len(xml_bytes))
-        text = random_bytes + packed_length + xml_bytes + self.corp_id.encode()
-        padded = self._pkcs7_pad(text)
+        xml_end = 20 + len(xml_bytes)
+        text_length = xml_end + len(self._corp_id_bytes)
+        pad_length = self._pkcs7_pad_length(text_length)
 
-        cipher = AES.new(self.aes_key, AES.MODE_CBC, self.iv)
-        encrypt = base64.b64encode(cipher.encrypt(padded)).decode()
+        # Lay out random(16) | length(4) | xml | corp_id | padding in one buffer
+        buf = bytearray(text_length + pad_length)
+        buf[:16] = os.urandom(16)
+        struct.pack_into(">I", buf, 16, len(xml_bytes))
+        buf[20:xml_end] = xml_bytes
+        buf[xml_end:text_length] = self._corp_id_bytes
+        buf[text_length:] = bytes((pad_length,)) * pad_length
+
+        encrypt = base64.b64encode(self._new_cipher().encrypt(buf)).decode()
         signature = self._sha1(timestamp, nonce, encrypt)
         return {
             "msg_signature": signature,
@@ -67,18 +80,24 @@ class WeComCrypto:
         }
 
     def _sha1(self, timestamp: str, nonce: str, encrypt: str) -> str:
-        params = sorted([self.token, timestamp, nonce, encrypt])
-        return hashlib.sha1("".join(params).encode()).hexdigest()
+        # Only the three per-request values need sorting; the pre-encoded token is
+        # slotted in. UTF-8 byte order matches code point order, so sorting bytes
+        # gives the same order as sorting the strings.
+        params = sorted((timestamp.encode(), nonce.encode(), encrypt.encode()))
+        bisect.insort(params, self._token_bytes)
+        digest = hashlib.sha1()
+        for param in params:
+            digest.update(param)
+        return digest.hexdigest()
 
     @staticmethod
     def _pkcs7_unpad(text: bytes) -> bytes:
         pad = text[-1]
-        if pad < 1 or pad > 32:
+        if not 1 <= pad <= 32 or text[-pad:] != bytes((pad,)) * pad:
             raise WeComCryptoError("Invalid padding")
         return text[:-pad]
 
     @staticmethod
-    def _pkcs7_pad(text: bytes) -> bytes:
+    def _pkcs7_pad_length(length: int) -> int:
         block_size = AES.block_size
-        pad_length = block_size - len(text) % block_size
-        return text + bytes([pad_length]) * pad_length
+        return block_size - length % block_size
@@ -1,11 +1,73 @@
 """统一消息模板模块"""
-from typing import Optional, Dict, Any
+import functools
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
+from urllib.parse import quote
+
+
+# 通知中的文件大小只区分 MB / GB，按 bit_length 是否超过 30（即 >= 1 GiB）选择
+_NOTIFY_SIZE_UNITS = ((1 << 20, "MB"), (1 << 30, "GB"))
+
+# 管理员通知的状态映射
+_ADMIN_STATUS_LABELS = {
+    'start': '📥 新任务开始',
+    'complete': '✅ 下载完成',
+    'error': '❌ 下载失败',
+    '403_error': '🔒 403错误',
+    '403_retry': '🔄 重试下载',
+    'network_error': '🌐 网络错误',
+    'network_retry': '🔄 网络重试'
+}
+
+# 管理员通知描述中各行的标签，模块加载时创建一次
+_LABEL_STATUS = "📊 状态: "
+_LABEL_USER = "👤 用户: "
+_LABEL_SOURCE = "🌐 来源: "
+_LABEL_URL = "🔗 URL: "
+_LABEL_TITLE = "📹 标题: "
+_LABEL_SIZE = "📦 大小: "
+_LABEL_DURATION = "⏱️ 耗时: "
+_LABEL_RETRIES = "🔁 重试次数: "
+_LABEL_ERROR = "⚠️ 错误: "
+_LABEL_TIME = "🕐 时间: "
+
+# 管理员通知标题前缀；没有视频标题时，除 complete/start 外显示 "任务 <id>"
+_ADMIN_TITLE_PREFIXES = {
+    'complete': '✅ 下载完成',
+    'error': '❌ 下载失败',
+    '403_error': '🔒 403错误',
+    '403_retry': '🔄 Cookie同步中',
+    'network_error': '🌐 网络错误',
+    'network_retry': '🔄 网络重试',
+    'start': '📥 新任务'
+}
 
 
 class MessageTemplates:
     """统一的消息模板类"""
 
+    @staticmethod
+    def format_file_size(file_size) -> Optional[str]:
+        """将字节数格式化为通知使用的大小文本，如 12.3 MB / 1.5 GB"""
+        if not isinstance(file_size, (int, float)) or file_size <= 0:
+            return None
+        divisor, unit = _NOTIFY_SIZE_UNITS[int(file_size).bit_length() > 30]
+        return f"{file_size / divisor:.1f} {unit}"
+
+    @staticmethod
+    def format_duration(duration) -> Optional[str]:
+        """将秒数格式化为 分:秒 文本，如 3:07；非数字或0返回None"""
+        if not duration or not isinstance(duration, (int, float)):
+            return None
+        secs = int(duration)
+        return f"{secs // 60}:{secs % 60:02d}"
+
+    @staticmethod
+    @functools.lru_cache(maxsize=512)
+    def proxy_thumbnail_url(public_base_url: str, thumbnail: str) -> str:
+        """生成经由本服务代理的缩略图地址（同一任务的多条通知复用编码结果）"""
+        return f"{public_base_url}/api/proxy-thumbnail?url={quote(thumbnail, safe='')}"
+
     @staticmethod
     def format_admin_notification(
         task_id: str,
@@ -39,80 +101,78 @@ class MessageTemplates:
         Returns:
             格式化的消息字典
         """
-        # 状态映射
-        status_map = {
-            'start': '📥 新任务开始',
-            'complete': '✅ 下载完成',
-            'error': '❌ 下载失败',
-            '403_error': '🔒 403错误',
-            '403_retry': '🔄 重试下载',
-            'network_error': '🌐 网络错误',
-            'network_retry': '🔄 网络重试'
+        msg_title, head, tail, link = MessageTemplates._render_admin_notification(
+            task_id, status, user_id, source, url, title,
+            download_link, error_msg, file_size, duration, retry_count
+        )
+        # 时间行插在渲染结果的中间
+        time_line = _LABEL_TIME + datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        description = "".join((head, "\n", time_line, tail))
+
+        return {
+            'title': msg_title,
+            'description': description,
+            'url': link,
+            'picurl': ''
         }
 
+    @staticmethod
+    def _render_admin_notification(
+        task_id: str,
+        status: str,
+        user_id: str,
+        source: str,
+        url: Optional[str],
+        title: Optional[str],
+        download_link: Optional[str],
+        error_msg: Optional[str],
+        file_size: Optional[str],
+        duration: Optional[str],
+        retry_count: int
+    ) -> Tuple[str, str, str, Optional[str]]:
+        """渲染管理员通知中与时间无关的部分，返回 (标题, 时间行之前的描述, 时间行之后的描述, 链接)"""
         # 构建标题
-        if status == 'complete' and title:
-            msg_title = f"✅ 下载完成: {title[:30]}{'...' if len(title) > 30 else ''}"
-        elif status == 'error':
-            msg_title = f"❌ 下载失败: {title[:30]}{'...' if len(title) > 30 else ''}" if title else f"❌ 下载失败: 任务 {task_id}"
-        elif status == '403_error':
-            msg_title = f"🔒 403错误: {title[:30]}{'...' if len(title) > 30 else ''}" if title else f"🔒 403错误: 任务 {task_id}"
-        elif status == '403_retry':
-            msg_title = f"🔄 Cookie同步中: {title[:30]}{'...' if len(title) > 30 else ''}" if title else f"🔄 Cookie同步中: 任务 {task_id}"
-        elif status == 'network_error':
-            msg_title = f"🌐 网络错误: {title[:30]}{'...' if len(title) > 30 else ''}" if title else f"🌐 网络错误: 任务 {task_id}"
-        elif status == 'network_retry':
-            msg_title = f"🔄 网络重试: {title[:30]}{'...' if len(title) > 30 else ''}" if title else f"🔄 网络重试: 任务 {task_id}"
-        elif status == 'start' and title:
-            msg_title = f"📥 新任务: {title[:30]}{'...' if len(title) > 30 else ''}"
+        prefix = _ADMIN_TITLE_PREFIXES.get(status)
+        if prefix and title:
+            short_title = f"{title[:30]}..." if len(title) > 30 else title
+            msg_title = f"{prefix}: {short_title}"
+        elif prefix and status not in ('complete', 'start'):
+            msg_title = f"{prefix}: 任务 {task_id}"
         else:
             msg_title = f"📥 新任务: {task_id}"
 
-        # 构建描述
-        description_parts = []
-        description_parts.append(f"📊 状态: {status_map.get(status, status)}")
-        description_parts.append(f"👤 用户: {user_id}")
-        description_parts.append(f"🌐 来源: {source}")
-
-        if url:
-            description_parts.append(f"🔗 URL: {url}")
-
-        if title and status != 'complete':  # complete状态标题已在msg_title中
-            description_parts.append(f"📹 标题: {title}")
-
-        if file_size:
-            description_parts.append(f"📦 大小: {file_size}")
-
-        if duration:
-            description_parts.append(f"⏱️ 耗时: {duration}")
-
-        if retry_count > 0:
-            description_parts.append(f"🔁 重试次数: {retry_count}")
-
+        # 限制错误消息长度
+        error_display = None
         if error_msg:
-            # 限制错误消息长度
             error_display = error_msg[:100] + '...' if len(error_msg) > 100 else error_msg
-            description_parts.append(f"⚠️ 错误: {error_display}")
 
-        description_parts.append(f"🕐 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        # 构建描述：前三行始终存在，其余行仅在有值时输出
+        optional_rows = (
+            (_LABEL_URL, url),
+            (_LABEL_TITLE, title if status != 'complete' else None),  # complete状态标题已在msg_title中
+            (_LABEL_SIZE, file_size),
+            (_LABEL_DURATION, duration),
+            (_LABEL_RETRIES, str(retry_count) if retry_count > 0 else None),
+            (_LABEL_ERROR, error_display),
+        )
+        head = "\n".join((
+            _LABEL_STATUS + _ADMIN_STATUS_LABELS.get(status, status),
+            f"{_LABEL_USER}{user_id}",
+            f"{_LABEL_SOURCE}{source}",
+            *(label + value for label, value in optional_rows if value),
+        ))
 
         # 确定链接
+        tail = ""
         if status == 'complete' and download_link:
             link = download_link
-            description_parts.append("\n💾 点击卡片下载文件")
+            tail = "\n\n💾 点击卡片下载文件"
         elif url:
             link = url
         else:
             link = None
 
-        description = "\n".join(description_parts)
-
-        return {
-            'title': msg_title,
-            'description': description,
-            'url': link,
-            'picurl': ''
-        }
+        return msg_title, head, tail, link
 
     @staticmethod
     def format_user_notification(
@@ -135,17 +195,19 @@ class MessageTemplates:
         Returns:
             格式化的消息字符串
         """
+        short_title = f"{title[:50]}..." if title else None
+
         if status == 'start':
-            return f"📥 开始下载: {title[:50]}..." if title else "📥 开始下载任务"
+            return f"📥 开始下载: {short_title}" if title else "📥 开始下载任务"
 
         elif status == 'complete':
-            msg = f"✅ 下载完成: {title[:50]}..." if title else "✅ 下载完成"
+            msg = f"✅ 下载完成: {short_title}" if title else "✅ 下载完成"
             if download_link:
                 msg += f"\n🔗 下载链接: {download_link}"
             return msg
 
         elif status == 'error':
-            msg = f"❌ 下载失败: {title[:50]}..." if title else "❌ 下载失败"
+            msg = f"❌ 下载失败: {short_title}" if title else "❌ 下载失败"
             if error_msg:
                 error_display = error_msg[:100] + '...' if len(error_msg) > 100 else error_msg
                 msg += f"\n⚠️ 错误: {error_display}"
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import logging
 import os
 import re
-from collections import deque
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime
-from typing import Any, Deque, Dict, Optional, Set
+from io import BytesIO
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple, Union
 from xml.etree import ElementTree as ET
 
 from fastapi import HTTPException
@@ -16,17 +20,55 @@ from ytb.downloader import YTDownloader
 from ytb.history_manager import HistoryManager
 from wecom.message_templates import MessageTemplates
 
-from .client import WeComClient, WeComAPIError
+from .client import MAX_NEWS_ARTICLES, WeComClient, WeComAPIError
 from .crypto import WeComCrypto, WeComCryptoError
 
+try:
+    from lxml import etree as LET
+except ImportError:  # lxml is optional; fall back to the stdlib parser
+    LET = None
+
 logger = logging.getLogger(__name__)
 
+# Seconds a get_video_info result is reused for the same URL, and how many URLs are kept
+_INFO_TTL = 600
+_INFO_CACHE_MAX = 256
+# Window (seconds) during which video news for the same user is merged into one message
+NEWS_COALESCE_DELAY = 0.1
+
+# Callback fields the service actually reads; _parse_xml ignores everything else
+_WANTED = frozenset({"MsgType", "MsgId", "FromUserName", "Content", "CreateTime", "AgentID", "ChatId"})
+# WeCom's callback envelope is always <xml>...<Encrypt>base64, optionally CDATA-wrapped</Encrypt>...</xml>
+_ENCRYPT_RE = re.compile(r"<Encrypt>(?:<!\[CDATA\[)?([A-Za-z0-9+/=]+)(?:\]\]>)?</Encrypt>")
+
+
+def _safe_getsize(path: str) -> Optional[int]:
+    """os.path.getsize that returns None instead of raising OSError."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def _iter_xml_end(text: str):
+    """Stream ``(event, element)`` end events with lxml when available, otherwise ElementTree."""
+    source = BytesIO(text.encode("utf-8"))
+    if LET is not None:
+        # Callback XML never needs entities or network access; disabling both also blocks XXE
+        return LET.iterparse(
+            source, events=("end",), resolve_entities=False, no_network=True, huge_tree=False
+        )
+    return ET.iterparse(source, events=("end",))
+
 
 class WeComService:
     """Glue code between WeCom callbacks and the downloader."""
 
-    URL_PATTERN = re.compile(r"https?://\S+")
-    YOUTUBE_PATTERN = re.compile(r"(?:(?:https?://)?(?:www\.)?(?:youtube\.com|youtu\.be|m\.youtube\.com))/\S+")
+    # 完整的http(s) URL，或缺少协议的YouTube链接；一次扫描即可
+    URL_PATTERN = re.compile(
+        r"(?P<full>https?://\S+)"
+        r"|(?P<yt>(?:www\.)?(?:youtube\.com|youtu\.be|m\.youtube\.com)/\S+)"
+    )
 
     def __init__(
         self,
@@ -40,13 +82,33 @@ class WeComService:
         self.client: Optional[WeComClient] = None
         self.crypto: Optional[WeComCrypto] = None
         self.task_context: Dict[str, Dict[str, Any]] = {}
-        self.wecom_config: Dict[str, Any] = {}
-        self._recent_msg_ids: Deque[str] = deque(maxlen=500)
-        self._recent_msg_index: Set[str] = set()
+        self.wecom_config: Mapping[str, Any] = {}
+        # LRU dedup cache; the least recently seen id is evicted once full
+        self._recent: "OrderedDict[Union[str, bytes], None]" = OrderedDict()
+        self._recent_max = 500
+        # URL -> (fetched_at, info) from get_video_info, plus in-flight lookups
+        self._info_cache: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._info_pending: Dict[str, asyncio.Future] = {}
+        # touser -> queued (article, text fallback) pairs and the task that will send them
+        self._pending_news: Dict[Optional[str], List[Tuple[Dict[str, Any], str]]] = {}
+        self._news_flushers: Dict[Optional[str], asyncio.Task] = {}
+        # Completion waiters for in-flight downloads (strong refs until they finish)
+        self._monitor_tasks: "set[asyncio.Task]" = set()
         self.reload_config()
 
     def reload_config(self) -> None:
+        self._close_client_later(self.client)
         self.wecom_config = self.config_manager.get_wecom_config()
+        # Public base URL derived once per config instead of on every notification
+        self._public_base = (self.wecom_config.get("public_base_url") or "").rstrip("/")
+        self._admin_users: List[str] = list(self.wecom_config.get("admin_users") or [])
+        self._admin_users_set = frozenset(self._admin_users)
+        self._notify_admin = bool(self.wecom_config.get("notify_admin", False))
+        self._fast_notify = bool(self.wecom_config.get("fast_notify", False))
+        self._default_format_id = (
+            self.wecom_config.get("default_format_id")
+            or "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
+        )
         if self._is_configured():
             try:
                 self.client = WeComClient(self.wecom_config)
@@ -64,15 +126,33 @@ class WeComService:
             self.crypto = None
             logger.info("WeCom integration disabled: missing configuration")
 
+    @staticmethod
+    def _close_client_later(client: Optional[WeComClient]) -> None:
+        """Release a replaced client's connection pool without blocking reload_config."""
+        if client is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(client.close())
+
+    async def close(self) -> None:
+        # Deliver any news still waiting in a coalescing window
+        if self._news_flushers:
+            await asyncio.gather(*self._news_flushers.values(), return_exceptions=True)
+        if self.client:
+            await self.client.close()
+
     def _is_configured(self) -> bool:
-        required = [
-            self.wecom_config.get("corp_id"),
-            self.wecom_config.get("agent_id") is not None,
-            self.wecom_config.get("app_secret"),
-            self.wecom_config.get("token"),
-            self.wecom_config.get("encoding_aes_key"),
-        ]
-        return all(required)
+        config = self.wecom_config
+        return (
+            bool(config.get("corp_id"))
+            and config.get("agent_id") is not None
+            and bool(config.get("app_secret"))
+            and bool(config.get("token"))
+            and bool(config.get("encoding_aes_key"))
+        )
 
     def verify_url(self, msg_signature: str, timestamp: str, nonce: str, echostr: str) -> str:
         if not self.crypto:
@@ -106,19 +186,77 @@ class WeComService:
         # Respond with plaintext "success" as acknowledgement
         return "success"
 
+    @staticmethod
+    def _estimate_filesize(formats: List[Dict[str, Any]]) -> Optional[int]:
+        """Estimate the download size from yt-dlp formats in a single pass.
+
+        Method 1 sums the largest video and audio-only streams (MP4/M4A preferred),
+        method 2 takes the largest combined stream (MP4 preferred); the larger of the
+        two wins. If neither applies, the first format with any size is used.
+
+        ``formats`` comes from ``get_video_info``, whose ``filesize`` already falls
+        back to ``filesize_approx``, so each format needs a single size lookup.
+        """
+        # Best (preferred container, size) per category: tuples order MP4/M4A above any
+        # other container, then by size, so one comparison replaces the nested if/else
+        best_video = best_audio = best_combined = (False, 0)
+        first_size = None
+
+        for fmt in formats:
+            get = fmt.get
+            size = get('filesize')
+            if not size:
+                continue
+            if first_size is None:
+                first_size = size
+
+            ext = get('ext')
+            if get('vcodec') != 'none':
+                key = (ext == 'mp4', size)
+                best_video = max(best_video, key)
+                if get('acodec') != 'none':
+                    best_combined = max(best_combined, key)
+            elif get('acodec') != 'none':
+                best_audio = max(best_audio, (ext == 'm4a', size))
+
+        video_size = best_video[1]
+        audio_size = best_audio[1]
+        combined_size = best_combined[1]
+
+        separate_size = 0
+        if video_size and audio_size:
+            separate_size = video_size + audio_size
+        elif video_size:
+            # 如果只有视频大小，估算音频大小约为视频的10-20%
+            separate_size = int(video_size * 1.15)
+
+        estimated_size = max(separate_size, combined_size) or first_size
+        logger.info(
+            f"Estimated size - video: {video_size}, audio: {audio_size}, "
+            f"combined: {combined_size}, estimate: {estimated_size} bytes"
+        )
+        return estimated_size
+
     async def _handle_text_message(self, payload: Dict[str, Any]) -> None:
         msg_id = str(payload.get("MsgId", ""))
 
         # 优先检查消息ID重复
-        if msg_id and self._is_duplicate_message(msg_id):
+        if msg_id and msg_id in self._recent:
+            # WeCom retries unacknowledged callbacks; keep ids that are still being retried
+            self._recent.move_to_end(msg_id)
             logger.info("Duplicate WeCom message %s ignored", msg_id)
             return
 
         # 如果消息ID为空，立即标记消息为已处理防止重复（基于内容和时间戳）
         if not msg_id:
             logger.warning("Message ID is empty, using content-based deduplication")
-            content_key = f"{payload.get('FromUserName', '')}_{payload.get('Content', '')[:50]}_{payload.get('CreateTime', '')}"
-            if self._is_duplicate_message(content_key):
+            # 使用固定16字节的摘要作为去重键，避免缓存较长的字符串
+            content_key = hashlib.blake2b(
+                f"{payload.get('FromUserName') or ''}|{(payload.get('Content') or '')[:50]}|{payload.get('CreateTime') or ''}".encode(),
+                digest_size=16,
+            ).digest()
+            if content_key in self._recent:
+                self._recent.move_to_end(content_key)
                 logger.info("Duplicate content-based message ignored")
                 return
             self._mark_message_processed(content_key)
@@ -135,17 +273,12 @@ class WeComService:
             )
             return
 
-
-        format_id = self.wecom_config.get(
-            "default_format_id",
-            "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-        )
+        format_id = self._default_format_id
         # 立即标记消息为已处理，防止在任务创建过程中收到重复请求
         if msg_id:
             self._mark_message_processed(msg_id)
 
         # Generate task_id early so we can set up callbacks before download starts
-        import uuid
         task_id = str(uuid.uuid4())
 
         # Create task context early for 403 callback
@@ -157,13 +290,10 @@ class WeComService:
             "url": url,
         }
 
-        # Set up the notification callback for 403 errors BEFORE starting download
+        # Register the 403 notification handler BEFORE starting download; the
+        # downloader passes this task's context back, so no per-task closure is needed
         context = self.task_context[task_id]
-        async def notify_403_callback(task_id: str, url: str, status: str, retry_count: int = 0, final: bool = False, success: bool = False):
-            await self._handle_403_notification(task_id, url, status, retry_count, final, context, success)
-
-        # Register the callback for this specific task
-        self.downloader.set_403_notification_callback(task_id, notify_403_callback)
+        self.downloader.set_403_notification_callback(task_id, self._handle_403_notification, context)
 
         try:
             # Now start the download with pre-assigned task_id
@@ -172,7 +302,7 @@ class WeComService:
                 logger.warning(f"Task ID mismatch: expected {task_id}, got {actual_task_id}")
                 # Update context if task_id changed
                 self.task_context[actual_task_id] = self.task_context.pop(task_id)
-                self.downloader.set_403_notification_callback(actual_task_id, notify_403_callback)
+                self.downloader.set_403_notification_callback(actual_task_id, self._handle_403_notification, context)
                 task_id = actual_task_id
         except Exception as exc:  # noqa: BLE001
             logger.exception("Failed to enqueue download for %s", url)
@@ -182,133 +312,21 @@ class WeComService:
             return
 
         video_info: Dict[str, Any] = {}
-        try:
-            video_info = await self.downloader.get_video_info(url)
-
-            # 从formats中提取文件大小信息
-            if video_info.get('formats'):
-                estimated_size = None
-
-
-                # 方法1: 分别找最大的视频和音频格式并相加（优先MP4+M4A）
-                estimated_size_separate = None
-                combined_size_info = ""
-
-                # 找最大的视频格式（优先MP4）
-                best_video_size = 0
-                video_formats = [f for f in video_info['formats']
-                               if f.get('vcodec') != 'none' and (f.get('filesize') or f.get('filesize_approx'))]
-
-                # 优先选择MP4格式的视频
-                mp4_video_formats = [f for f in video_formats if f.get('ext') == 'mp4']
-
-                if mp4_video_formats:
-                    best_mp4_format = None
-                    for fmt in mp4_video_formats:
-                        size = fmt.get('filesize') or fmt.get('filesize_approx')
-                        if size and size > best_video_size:
-                            best_video_size = size
-                            best_mp4_format = fmt
-                    if best_mp4_format:
-                        combined_size_info += f"视频: {best_mp4_format.get('format_id')}({best_video_size/1024/1024:.2f}MB) + "
-                    logger.info(f"Found best MP4 video size: {best_video_size} bytes")
-                else:
-                    # 如果没有MP4，选择其他格式中的最大
-                    best_other_format = None
-                    for fmt in video_formats:
-                        size = fmt.get('filesize') or fmt.get('filesize_approx')
-                        if size and size > best_video_size:
-                            best_video_size = size
-                            best_other_format = fmt
-                    if best_other_format:
-                        combined_size_info += f"视频: {best_other_format.get('format_id')}({best_video_size/1024/1024:.2f}MB) + "
-                    logger.info(f"Found best non-MP4 video size: {best_video_size} bytes")
-
-                # 找最大的音频格式（优先M4A）
-                best_audio_size = 0
-                audio_formats = [f for f in video_info['formats']
-                               if f.get('acodec') != 'none' and f.get('vcodec') == 'none'
-                               and (f.get('filesize') or f.get('filesize_approx'))]
-
-                # 优先选择M4A格式的音频
-                m4a_audio_formats = [f for f in audio_formats if f.get('ext') == 'm4a']
-
-                if m4a_audio_formats:
-                    best_m4a_format = None
-                    for fmt in m4a_audio_formats:
-                        size = fmt.get('filesize') or fmt.get('filesize_approx')
-                        if size and size > best_audio_size:
-                            best_audio_size = size
-                            best_m4a_format = fmt
-                    if best_m4a_format:
-                        combined_size_info += f"音频: {best_m4a_format.get('format_id')}({best_audio_size/1024/1024:.2f}MB)"
-                    logger.info(f"Found best M4A audio size: {best_audio_size} bytes")
-                else:
-                    # 如果没有M4A，选择其他格式中的最大
-                    best_other_audio = None
-                    for fmt in audio_formats:
-                        size = fmt.get('filesize') or fmt.get('filesize_approx')
-                        if size and size > best_audio_size:
-                            best_audio_size = size
-                            best_other_audio = fmt
-                    if best_other_audio:
-                        combined_size_info += f"音频: {best_other_audio.get('format_id')}({best_audio_size/1024/1024:.2f}MB)"
-                    logger.info(f"Found best non-M4A audio size: {best_audio_size} bytes")
-
-                # 如果同时找到了视频和音频大小，相加得到预估总大小
-                if best_video_size > 0 and best_audio_size > 0:
-                    estimated_size_separate = best_video_size + best_audio_size
-                    logger.info(f"Method 1 - Separate formats - Video: {best_video_size}, Audio: {best_audio_size}, Total: {estimated_size_separate} bytes")
-                elif best_video_size > 0:
-                    # 如果只有视频大小，估算音频大小约为视频的10-20%
-                    estimated_size_separate = int(best_video_size * 1.15)
-                    logger.info(f"Method 1 - Video only: {best_video_size} -> {estimated_size_separate} bytes")
-
-                # 方法2: 查找完整的合并格式（包含音频和视频），优先MP4
-                estimated_size_combined = None
-                combined_formats = [f for f in video_info['formats']
-                                  if (f.get('acodec') != 'none' and f.get('vcodec') != 'none'
-                                      and (f.get('filesize') or f.get('filesize_approx')))]
-
-                # 优先选择MP4格式的合并格式
-                mp4_combined = [f for f in combined_formats if f.get('ext') == 'mp4']
-                if mp4_combined:
-                    # 选择最大的MP4合并格式
-                    best_combined = max(mp4_combined, key=lambda x: x.get('filesize') or x.get('filesize_approx') or 0)
-                    estimated_size_combined = best_combined.get('filesize') or best_combined.get('filesize_approx')
-                    logger.info(f"Method 2 - MP4 combined format size: {estimated_size_combined} bytes")
-                elif combined_formats:
-                    # 如果没有MP4合并格式，选择其他最大的合并格式
-                    best_combined = max(combined_formats, key=lambda x: x.get('filesize') or x.get('filesize_approx') or 0)
-                    estimated_size_combined = best_combined.get('filesize') or best_combined.get('filesize_approx')
-                    logger.info(f"Method 2 - Non-MP4 combined format size: {estimated_size_combined} bytes")
-
-                # 比较两种方法，选择较大的估算值（通常更准确）
-                estimated_size = None
-                if estimated_size_separate and estimated_size_combined:
-                    if estimated_size_separate > estimated_size_combined:
-                        estimated_size = estimated_size_separate
-                    else:
-                        estimated_size = estimated_size_combined
-                elif estimated_size_separate:
-                    estimated_size = estimated_size_separate
-                elif estimated_size_combined:
-                    estimated_size = estimated_size_combined
-
-                # 方法3: 如果还没有，使用任何有大小信息的格式
-                if not estimated_size:
-                    for fmt in video_info['formats']:
-                        if fmt.get('filesize') or fmt.get('filesize_approx'):
-                            estimated_size = fmt.get('filesize') or fmt.get('filesize_approx')
-                            logger.info(f"Method 3 - Fallback format size: {estimated_size} bytes")
-                            break
-
-                if estimated_size:
-                    video_info['estimated_filesize'] = estimated_size
-
-            logger.info(f"Video info processed, estimated size: {video_info.get('estimated_filesize')}")
-        except Exception as exc:  # noqa: BLE001
-            logger.warning("Failed to fetch video info for %s: %s", url, exc)
+        fast_notify = self._fast_notify
+        # 快速通知模式：跳过yt-dlp元数据探测，只回复文本确认
+        if not fast_notify:
+            try:
+                video_info = await self._cached_video_info(url)
+
+                # 从formats中提取文件大小信息（纯CPU计算，放到线程中避免阻塞事件循环）
+                if video_info.get('formats'):
+                    estimated_size = await asyncio.to_thread(self._estimate_filesize, video_info['formats'])
+                    if estimated_size:
+                        video_info['estimated_filesize'] = estimated_size
+
+                logger.info(f"Video info processed, estimated size: {video_info.get('estimated_filesize')}")
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Failed to fetch video info for %s: %s", url, exc)
 
         history_entry = {
             "id": task_id,
@@ -324,21 +342,25 @@ class WeComService:
         }
         self.history_manager.add_entry(history_entry)
 
-        # Send news message with video info and thumbnail
-        await self._send_video_news(
-            task_id=task_id,
-            title=history_entry['title'],
-            video_info=video_info,  # 这里包含完整的视频信息
-            url=url,
-            touser=user_id,
-            status_text="📥 开始下载"
-        )
+        if fast_notify:
+            await self._safe_notify(f"📥 开始下载任务\n任务 ID: {task_id}", touser=user_id)
+        else:
+            # Send news message with video info and thumbnail
+            await self._send_video_news(
+                task_id=task_id,
+                title=history_entry['title'],
+                video_info=video_info,  # 这里包含完整的视频信息
+                url=url,
+                touser=user_id,
+                status_text="📥 开始下载"
+            )
 
         # Update task context with actual video info
         self.task_context[task_id].update({
             "title": history_entry["title"],
             "duration": video_info.get("duration"),  # 保存时长信息
             "uploader": video_info.get("uploader"),  # 保存作者信息
+            "thumbnail": video_info.get("thumbnail"),  # 完成通知直接复用，无需重新获取视频信息
         })
 
         # Notify admins if enabled (but not if the user is an admin)
@@ -350,41 +372,43 @@ class WeComService:
             source="WeChat"
         )
 
-        asyncio.create_task(self._monitor_task(task_id))
+        self._watch_task(task_id)
+
+    def _watch_task(self, task_id: str) -> None:
+        """Start waiting for a task's completion; keep a reference so the waiter is not collected."""
+        waiter = asyncio.create_task(self._monitor_task(task_id))
+        self._monitor_tasks.add(waiter)
+        waiter.add_done_callback(self._monitor_tasks.discard)
 
     async def _monitor_task(self, task_id: str) -> None:
+        # The 403 notification callback is already set up in handle_wecom_download
         context = self.task_context.get(task_id, {})
         try:
-            # The 403 notification callback is already set up in handle_wecom_download
-            while True:
-                await asyncio.sleep(5)
-                status = self.downloader.get_download_status(task_id)
-                if not status:
-                    continue
-
-                current = status.get("status")
-                if current in {"completed", "error"}:
-                    await self._handle_completion(task_id, status, context)
-                    break
+            # Woken by the download thread finishing, not by polling
+            status = await self.downloader.wait_for_completion(task_id)
+            if status and status.get("status") in {"completed", "error"}:
+                await self._handle_completion(task_id, status, context)
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Failed to handle completion of task %s: %s", task_id, exc)
         finally:
             self.task_context.pop(task_id, None)
 
     async def _handle_completion(self, task_id: str, status: Dict[str, Any], context: Dict[str, Any]) -> None:
         status_name = status.get("status")
         update_payload = {"status": status_name}
+        notifications: List[Awaitable[Any]] = []
 
         if status_name == "completed":
             filepath = status.get("filepath")
             update_payload["file_path"] = filepath
+            # Stat once, off the event loop (slow on network storage)
+            size = await asyncio.to_thread(_safe_getsize, filepath) if filepath else None
             if filepath:
-                try:
-                    update_payload["file_size"] = os.path.getsize(filepath)
-                except OSError:
-                    update_payload["file_size"] = None
+                update_payload["file_size"] = size
 
             # Send completion news message
             title = context.get("title", "视频")
-            public_url = self.wecom_config.get("public_base_url", "").rstrip("/")
+            public_url = self._public_base
             download_link = f"{public_url}/api/download-file/{task_id}" if public_url else None
 
             # Debug logging
@@ -396,32 +420,17 @@ class WeComService:
             if history_entry:
                 # 获取历史记录中保存的完整视频信息
                 video_info = {
-                    "thumbnail": history_entry.get("thumbnail"),
+                    "thumbnail": history_entry.get("thumbnail") or context.get("thumbnail"),
                     "uploader": history_entry.get("uploader") or context.get("uploader"),
                     "duration": context.get("duration"),  # 从上下文获取时长
                     "file_size": history_entry.get("file_size")
                 }
 
-                # 如果上下文中没有时长，尝试重新获取视频信息
-                if not video_info.get("duration") and context.get("url"):
-                    try:
-                        fresh_info = await self.downloader.get_video_info(context.get("url"))
-                        video_info.update({
-                            "duration": fresh_info.get("duration"),
-                            "uploader": fresh_info.get("uploader")
-                        })
-                    except Exception:
-                        pass
-
                 # 添加实际文件大小
-                if filepath:
-                    try:
-                        actual_size = os.path.getsize(filepath)
-                        video_info["filesize"] = actual_size
-                    except OSError:
-                        pass
+                if size is not None:
+                    video_info["filesize"] = size
 
-            await self._send_video_news(
+            notifications.append(self._send_video_news(
                 task_id=task_id,
                 title=title,
                 video_info=video_info,
@@ -429,26 +438,34 @@ class WeComService:
                 touser=context.get("touser"),
                 status_text="✅ 下载完成",
                 download_link=download_link
-            )
+            ))
 
             # Notify admins about download completion with download link
-            await self._notify_admins_download_complete(
+            notifications.append(self._notify_admins_download_complete(
                 user_id=context.get("touser"),
                 task_id=task_id,
                 title=title,
                 url=context.get("url", ""),
                 download_link=download_link,
                 file_size=video_info.get("filesize")
-            )
+            ))
         else:
             update_payload["error_message"] = status.get("error", "未知错误")
             # For error, send text message
             message = f"❌ 下载任务失败，任务 ID: {task_id}\n原因：{status.get('error', '未知错误')}"
-            await self._safe_notify(message, **self._notification_targets(context))
+            notifications.append(self._safe_notify(message, **self._notification_targets(context)))
 
+        # Both are in-memory (history writes are flushed in the background), so
+        # they run before the network round-trips rather than after them
         self.history_manager.update_entry(task_id, update_payload)
         self.downloader.cleanup_task(task_id)
 
+        # User and admin notifications are independent; a failure in one must not cancel the other
+        results = await asyncio.gather(*notifications, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("Failed to send completion notification for task %s: %s", task_id, result)
+
     async def _safe_notify(self, message: str, **targets: Any) -> None:
         if not self.client:
             logger.warning("Cannot send WeCom message: client not configured")
@@ -458,6 +475,55 @@ class WeComService:
         except WeComAPIError as exc:
             logger.error("Failed to send WeCom message: %s", exc)
 
+    async def _fan_out_to_admins(
+        self,
+        admin_users: List[str],
+        send: Callable[[str], Awaitable[Any]],
+        label: str,
+    ) -> int:
+        """Run ``send(admin)`` for all admins concurrently; returns how many succeeded."""
+        if self.client:
+            try:
+                await self.client.ensure_token()
+            except Exception as exc:  # noqa: BLE001
+                # Each send will surface its own error below
+                logger.warning("Could not prefetch WeCom access token: %s", exc)
+        results = await asyncio.gather(
+            *(send(admin) for admin in admin_users),
+            return_exceptions=True,
+        )
+        sent = 0
+        for admin, result in zip(admin_users, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to send {label} to admin {admin}: {result}")
+            else:
+                logger.info(f"{label} sent to admin {admin}")
+                sent += 1
+        return sent
+
+    async def _send_admin_news(
+        self,
+        admin: str,
+        notification: Dict[str, Any],
+        url: Optional[str] = None,
+        picurl: Optional[str] = None,
+        text_fallback: bool = False,
+    ) -> None:
+        """Send a templated admin notification, optionally falling back to plain text."""
+        try:
+            await self.client.send_news(
+                title=notification['title'],
+                description=notification['description'],
+                picurl=picurl,
+                url=url,
+                touser=admin
+            )
+        except Exception:
+            if not text_fallback:
+                raise
+            admin_message = f"{notification['title']}\n\n{notification['description']}"
+            await self._safe_notify(admin_message, touser=admin)
+
     async def _send_video_news(
         self,
         task_id: str,
@@ -473,103 +539,149 @@ class WeComService:
             return
 
         try:
-            # 构建描述文本 - 统一格式
-            description_parts = []
-
-            # 状态行
-            description_parts.append(f"📊 状态: {status_text}")
-
-            # 任务信息
-            description_parts.append(f"🆔 任务ID: {task_id}")
+            # 构建描述文本 - 统一格式；每个字段只读取一次
+            get = video_info.get
+            uploader = get("uploader")
+            duration = get("duration")
+            actual_size = get("filesize") or get("file_size")
+            estimated_size = get("estimated_filesize")
+
+            description_parts = [
+                f"📊 状态: {status_text}",  # 状态行
+                f"🆔 任务ID: {task_id}",  # 任务信息
+            ]
 
             # 视频信息
-            if video_info.get("uploader"):
-                description_parts.append(f"👤 作者: {video_info['uploader']}")
+            if uploader:
+                description_parts.append(f"👤 作者: {uploader}")
 
-            if video_info.get("duration"):
-                duration = video_info["duration"]
-                if isinstance(duration, (int, float)):
-                    minutes, seconds = divmod(int(duration), 60)
-                    description_parts.append(f"⏱️ 时长: {minutes}:{seconds:02d}")
+            formatted_duration = MessageTemplates.format_duration(duration)
+            if formatted_duration:
+                description_parts.append(f"⏱️ 时长: {formatted_duration}")
 
             # 添加文件大小信息 - 优先使用实际文件大小，然后是预估大小
-            file_size = (video_info.get("filesize") or
-                        video_info.get("filesize_approx") or
-                        video_info.get("file_size") or
-                        video_info.get("estimated_filesize"))
-
-            if isinstance(file_size, (int, float)) and file_size > 0:
-                size_mb = file_size / (1024 * 1024)
-                if size_mb >= 1024:
-                    size_text = f"📦 大小: {size_mb/1024:.1f} GB"
-                else:
-                    size_text = f"📦 大小: {size_mb:.1f} MB"
-
+            file_size = (get("filesize") or get("filesize_approx") or
+                         get("file_size") or estimated_size)
+            formatted_size = MessageTemplates.format_file_size(file_size)
+            if formatted_size:
                 # 如果是预估大小，添加标识
-                if video_info.get("estimated_filesize") and not (video_info.get("filesize") or video_info.get("file_size")):
-                    size_text += " (预估)"
-
-                description_parts.append(size_text)
+                suffix = " (预估)" if estimated_size and not actual_size else ""
+                description_parts.append(f"📦 大小: {formatted_size}{suffix}")
 
             # 如果有下载链接，添加到描述中
             if download_link:
-                description_parts.append(f"\n💾 点击卡片下载文件")
+                description_parts.append("\n💾 点击卡片下载文件")
 
             description = "\n".join(description_parts)
 
             # 获取代理后的缩略图URL
-            picurl = None
-            if video_info.get("thumbnail"):
-                public_url = self.wecom_config.get("public_base_url", "").rstrip("/")
-                if public_url:
-                    # 使用代理接口
-                    import urllib.parse
-                    encoded_thumbnail = urllib.parse.quote(video_info["thumbnail"], safe='')
-                    picurl = f"{public_url}/api/proxy-thumbnail?url={encoded_thumbnail}"
+            picurl = self._proxy_thumbnail(video_info.get("thumbnail"))
 
             # Debug logging for URL selection
             final_url = download_link or url
             logger.info(f"Sending video news - download_link: {download_link}, original_url: {url}, using: {final_url}")
 
-            await self.client.send_news(
-                title=title or "YouTube 视频",
-                description=description,
-                picurl=picurl,
-                url=final_url,
-                touser=touser
-            )
+            article = {"title": title or "YouTube 视频", "description": description}
+            if picurl:
+                article["picurl"] = picurl
+            if final_url:
+                article["url"] = final_url
         except Exception as exc:  # noqa: BLE001
-            logger.error("Failed to send WeCom news: %s", exc)
-            # Fallback to text message
-            fallback_message = f"{status_text}\n任务 ID: {task_id}\n视频: {title}"
+            logger.error("Failed to build WeCom news: %s", exc)
+            article = None
+
+        # Fallback to text message
+        fallback_message = f"{status_text}\n任务 ID: {task_id}\n视频: {title}"
+        if article is None:
             await self._safe_notify(fallback_message, touser=touser)
+            return
+        await self._enqueue_news(touser, article, fallback_message)
+
+    async def _enqueue_news(self, touser: Optional[str], article: Dict[str, Any], fallback_message: str) -> None:
+        """Queue a news article; articles queued for one user within the window share a message.
+
+        The queue and its flush tasks live on the app loop. Callers on another loop
+        (a download thread's temporary loop, closed right after) hand the article over
+        to the app loop, or send it on its own when the app loop is not running.
+        """
+        app_loop = self.downloader.app_loop
+        if app_loop is None or app_loop is asyncio.get_running_loop():
+            self._queue_news(touser, article, fallback_message)
+            return
+        if app_loop.is_running():
+            try:
+                app_loop.call_soon_threadsafe(self._queue_news, touser, article, fallback_message)
+                return
+            except RuntimeError:
+                # App loop closed in the meantime (shutting down)
+                pass
+        await self._send_news_batches(touser, [(article, fallback_message)])
+
+    def _queue_news(self, touser: Optional[str], article: Dict[str, Any], fallback_message: str) -> None:
+        """Add to the user's queue; must run on the loop that owns the flush tasks."""
+        self._pending_news.setdefault(touser, []).append((article, fallback_message))
+        if touser not in self._news_flushers:
+            self._news_flushers[touser] = asyncio.create_task(self._flush_news_after(touser, NEWS_COALESCE_DELAY))
+
+    async def _flush_news_after(self, touser: Optional[str], delay: float) -> None:
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            # Articles queued from here on start a new window
+            self._news_flushers.pop(touser, None)
+            queued = self._pending_news.pop(touser, [])
+
+        await self._send_news_batches(touser, queued)
+
+    async def _send_news_batches(self, touser: Optional[str], queued: List[Tuple[Dict[str, Any], str]]) -> None:
+        for start in range(0, len(queued), MAX_NEWS_ARTICLES):
+            batch = queued[start:start + MAX_NEWS_ARTICLES]
+            try:
+                if not self.client:
+                    raise WeComAPIError("client not configured")
+                await self.client.send_news_articles([article for article, _ in batch], touser=touser)
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Failed to send WeCom news: %s", exc)
+                for _, fallback_message in batch:
+                    await self._safe_notify(fallback_message, touser=touser)
+
+    def _proxy_thumbnail(self, thumbnail: Optional[str]) -> Optional[str]:
+        """Thumbnail URL routed through this service's proxy, or None without a public base URL."""
+        if self._public_base and thumbnail:
+            # Shared, memoized builder: the same thumbnail is proxied for the user and every admin
+            return MessageTemplates.proxy_thumbnail_url(self._public_base, thumbnail)
+        return None
 
     @staticmethod
     def _extract_url(content: str) -> Optional[str]:
-        if not content:
+        # Every URL_PATTERN match contains "http" or "youtu"; skip the regex for plain chat text
+        if "http" not in content and "youtu" not in content:
             return None
 
-        # 首先尝试匹配完整的http(s)://URL
         match = WeComService.URL_PATTERN.search(content)
-        if match:
-            return match.group(0)
+        if not match:
+            return None
 
-        # 然后尝试匹配YouTube URL（可能没有协议）
-        youtube_match = WeComService.YOUTUBE_PATTERN.search(content)
-        if youtube_match:
-            url = youtube_match.group(0)
-            # 如果没有协议，添加https://
-            if not url.startswith(('http://', 'https://')):
-                url = 'https://' + url
-            return url
+        # 完整的http(s)://URL直接返回
+        full = match.group("full")
+        if full:
+            return full
 
-        return None
+        # YouTube URL没有协议，添加https://
+        return "https://" + match.group("yt")
 
     @staticmethod
     def _extract_encrypt(body: str) -> str:
+        # Fast path for the standard envelope; anything unusual goes through the XML parser
+        match = _ENCRYPT_RE.search(body)
+        if match:
+            return match.group(1)
         try:
-            root = ET.fromstring(body)
-            encrypt = root.findtext("Encrypt")
+            # Stop at the first <Encrypt> instead of building the whole tree
+            encrypt = next(
+                (elem.text for _, elem in _iter_xml_end(body) if elem.tag == "Encrypt"),
+                None,
+            )
             if not encrypt:
                 raise ValueError
             return encrypt
@@ -578,8 +690,15 @@ class WeComService:
 
     @staticmethod
     def _parse_xml(xml_text: str) -> Dict[str, Any]:
-        root = ET.fromstring(xml_text)
-        return {child.tag: child.text for child in root}
+        """Stream the decrypted message and collect only the fields in ``_WANTED``."""
+        out: Dict[str, Any] = {}
+        for _, elem in _iter_xml_end(xml_text):
+            if elem.tag in _WANTED:
+                out[elem.tag] = elem.text
+                elem.clear()
+                if len(out) == len(_WANTED):
+                    break
+        return out
 
     @staticmethod
     def _notification_targets(context: Dict[str, Any]) -> Dict[str, Any]:
@@ -590,17 +709,57 @@ class WeComService:
             targets["touser"] = context.get("touser")
         return targets
 
-    def _is_duplicate_message(self, msg_id: str) -> bool:
-        return msg_id in self._recent_msg_index
-
-    def _mark_message_processed(self, msg_id: str) -> None:
-        if msg_id in self._recent_msg_index:
+    async def _cached_video_info(self, url: str) -> Dict[str, Any]:
+        """Return get_video_info for a URL, reusing a recent result.
+
+        Concurrent lookups for the same URL share a single yt-dlp probe. The cache and
+        the shared futures belong to the app loop; callers on any other loop (a download
+        thread's temporary loop) bypass both and probe on their own.
+        """
+        app_loop = self.downloader.app_loop
+        if app_loop is not None and app_loop is not asyncio.get_running_loop():
+            return dict(await self.downloader.get_video_info(url))
+
+        now = time.monotonic()
+        cached = self._info_cache.get(url)
+        if cached:
+            if now - cached[0] < _INFO_TTL:
+                self._info_cache.move_to_end(url)
+                return dict(cached[1])
+            del self._info_cache[url]
+
+        pending = self._info_pending.get(url)
+        if pending is not None:
+            return dict(await asyncio.shield(pending))
+
+        future = asyncio.get_running_loop().create_future()
+        self._info_pending[url] = future
+        try:
+            info = await self.downloader.get_video_info(url)
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark retrieved so a lookup nobody else awaited does not log a warning
+            future.exception()
+            raise
+        else:
+            future.set_result(info)
+            self._info_cache[url] = (time.monotonic(), info)
+            if len(self._info_cache) > _INFO_CACHE_MAX:
+                self._info_cache.popitem(last=False)
+            return dict(info)
+        finally:
+            self._info_pending.pop(url, None)
+            if not future.done():
+                # This lookup was cancelled; let waiters fail rather than hang
+                future.cancel()
+
+    def _mark_message_processed(self, msg_id: Union[str, bytes]) -> None:
+        recent = self._recent
+        if msg_id in recent:
             return
-        if len(self._recent_msg_ids) == self._recent_msg_ids.maxlen:
-            oldest = self._recent_msg_ids.popleft()
-            self._recent_msg_index.discard(oldest)
-        self._recent_msg_ids.append(msg_id)
-        self._recent_msg_index.add(msg_id)
+        recent[msg_id] = None
+        if len(recent) > self._recent_max:
+            recent.popitem(last=False)
 
     async def _notify_admins_if_needed(
         self,
@@ -612,15 +771,15 @@ class WeComService:
         video_info: Dict[str, Any] = None
     ) -> None:
         """Notify admin users about download tasks if configured"""
-        if not self.wecom_config.get("notify_admin", False):
+        if not self._notify_admin:
             return
 
-        admin_users = self.wecom_config.get("admin_users", [])
+        admin_users = self._admin_users
         if not admin_users:
             return
 
         # Don't notify if the user is an admin themselves
-        if user_id in admin_users:
+        if user_id in self._admin_users_set:
             logger.info(f"Skipping admin notification - user {user_id} is an admin")
             return
 
@@ -635,26 +794,13 @@ class WeComService:
         )
 
         # Add video info if available
-        picurl = None
-        if video_info and video_info.get("thumbnail"):
-            public_url = self.wecom_config.get("public_base_url", "").rstrip("/")
-            if public_url:
-                import urllib.parse
-                encoded_thumbnail = urllib.parse.quote(video_info["thumbnail"], safe='')
-                picurl = f"{public_url}/api/proxy-thumbnail?url={encoded_thumbnail}"
-
-        for admin in admin_users:
-            try:
-                await self.client.send_news(
-                    title=notification['title'],
-                    description=notification['description'],
-                    picurl=picurl,
-                    url=url,
-                    touser=admin
-                )
-                logger.info(f"Admin notification sent to {admin} for task {task_id}")
-            except Exception as e:
-                logger.error(f"Failed to notify admin {admin}: {e}")
+        picurl = self._proxy_thumbnail(video_info.get("thumbnail") if video_info else None)
+
+        await self._fan_out_to_admins(
+            admin_users,
+            lambda admin: self._send_admin_news(admin, notification, url=url, picurl=picurl),
+            f"Admin notification for task {task_id}",
+        )
 
     async def _notify_admins_download_complete(
         self,
@@ -666,26 +812,20 @@ class WeComService:
         file_size: Optional[int]
     ) -> None:
         """Notify admin users about completed downloads with download link"""
-        if not self.wecom_config.get("notify_admin", False):
+        if not self._notify_admin:
             return
 
-        admin_users = self.wecom_config.get("admin_users", [])
+        admin_users = self._admin_users
         if not admin_users:
             return
 
         # Don't notify if the user is an admin themselves
-        if user_id in admin_users:
+        if user_id in self._admin_users_set:
             logger.info(f"Skipping admin completion notification - user {user_id} is an admin")
             return
 
         # Format file size
-        size_text = None
-        if file_size:
-            size_mb = file_size / (1024 * 1024)
-            if size_mb >= 1024:
-                size_text = f"{size_mb/1024:.1f} GB"
-            else:
-                size_text = f"{size_mb:.1f} MB"
+        size_text = MessageTemplates.format_file_size(file_size)
 
         # Get unified admin notification template
         notification = MessageTemplates.format_admin_notification(
@@ -700,23 +840,13 @@ class WeComService:
         )
 
         # Send news message with download link to admins
-        for admin in admin_users:
-            try:
-                await self.client.send_news(
-                    title=notification['title'],
-                    description=notification['description'],
-                    url=notification['url'] or url,
-                    touser=admin
-                )
-                logger.info(f"Admin completion notification sent to {admin} for task {task_id}")
-            except Exception as e:
-                # Fallback to text message
-                try:
-                    admin_message = f"{notification['title']}\n\n{notification['description']}"
-                    await self._safe_notify(admin_message, touser=admin)
-                    logger.info(f"Admin completion text notification sent to {admin}")
-                except Exception as e2:
-                    logger.error(f"Failed to notify admin {admin}: {e2}")
+        await self._fan_out_to_admins(
+            admin_users,
+            lambda admin: self._send_admin_news(
+                admin, notification, url=notification['url'] or url, text_fallback=True
+            ),
+            f"Admin completion notification for task {task_id}",
+        )
 
     async def _handle_403_notification(
         self,
@@ -731,8 +861,8 @@ class WeComService:
         """Handle 403 error and network error notifications to users and admins"""
         user_id = context.get("touser")
         title = context.get("title", "视频")
-        admin_users = self.wecom_config.get("admin_users", [])
-        is_admin = user_id in admin_users
+        admin_users = self._admin_users
+        is_admin = user_id in self._admin_users_set
 
         # Check if this is a network error
         is_network_error = "[网络错误]" in status
@@ -743,7 +873,7 @@ class WeComService:
             video_info = {}
             try:
                 # Try to get fresh video info
-                fresh_info = await self.downloader.get_video_info(url)
+                fresh_info = await self._cached_video_info(url)
                 video_info = {
                     'thumbnail': fresh_info.get('thumbnail'),
                     'uploader': fresh_info.get('uploader'),
@@ -773,7 +903,7 @@ class WeComService:
             )
 
             # Notify admins about successful recovery (if user is not admin)
-            if self.wecom_config.get("notify_admin", False) and admin_users and not is_admin:
+            if self._notify_admin and admin_users and not is_admin:
                 # Use unified template for recovery notification
                 if is_network_error:
                     notification = MessageTemplates.format_admin_notification(
@@ -796,17 +926,11 @@ class WeComService:
                         retry_count=retry_count
                     )
 
-                for admin in admin_users:
-                    try:
-                        await self.client.send_news(
-                            title=notification['title'],
-                            description=notification['description'],
-                            url=notification['url'],
-                            touser=admin
-                        )
-                        logger.info(f"Recovery notification sent to admin {admin}")
-                    except Exception as e:
-                        logger.error(f"Failed to notify admin {admin} about recovery: {e}")
+                await self._fan_out_to_admins(
+                    admin_users,
+                    lambda admin: self._send_admin_news(admin, notification, url=notification['url']),
+                    "Recovery notification",
+                )
             return
 
         # Construct the error notification message
@@ -842,8 +966,7 @@ class WeComService:
 重试次数: {retry_count}/3"""
 
             # Send combined message if user is admin
-            if is_admin and self.wecom_config.get("notify_admin", False):
-                from datetime import datetime
+            if is_admin and self._notify_admin:
                 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
                 # Add admin info to the message
@@ -903,18 +1026,17 @@ class WeComService:
 - 浏览器 Cookie 提取是否可用
 - YouTube 账号状态"""
 
-                    for admin in other_admins:
-                        try:
-                            await self._safe_notify(admin_message, touser=admin)
-                            logger.info(f"403 error notification sent to other admin {admin}")
-                        except Exception as e:
-                            logger.error(f"Failed to notify admin {admin}: {e}")
+                    await self._fan_out_to_admins(
+                        other_admins,
+                        lambda admin: self._safe_notify(admin_message, touser=admin),
+                        "403 error notification",
+                    )
             else:
                 # User is not admin, send normal message
                 await self._safe_notify(message, touser=user_id)
 
                 # Notify all admins
-                if self.wecom_config.get("notify_admin", False) and admin_users:
+                if self._notify_admin and admin_users:
                     # Use unified template for admin notification
                     if is_network_error:
                         error_status = 'error'
@@ -934,22 +1056,13 @@ class WeComService:
                         retry_count=retry_count
                     )
 
-                    for admin in admin_users:
-                        try:
-                            await self.client.send_news(
-                                title=notification['title'],
-                                description=notification['description'],
-                                url=notification['url'],
-                                touser=admin
-                            )
-                            logger.info(f"403 error notification sent to admin {admin}")
-                        except Exception as e:
-                            # Fallback to text message
-                            try:
-                                admin_message = f"{notification['title']}\n\n{notification['description']}"
-                                await self._safe_notify(admin_message, touser=admin)
-                            except Exception as e2:
-                                logger.error(f"Failed to notify admin {admin}: {e2}")
+                    await self._fan_out_to_admins(
+                        admin_users,
+                        lambda admin: self._send_admin_news(
+                            admin, notification, url=notification['url'], text_fallback=True
+                        ),
+                        "403 error notification",
+                    )
         else:
             # Progress notification during retry - only send to user
             if is_network_error:
@@ -971,14 +1084,13 @@ class WeComService:
             logger.warning(f"Current config: corp_id={self.wecom_config.get('corp_id')}, agent_id={self.wecom_config.get('agent_id')}, has_secret={bool(self.wecom_config.get('app_secret'))}")
             return False
 
-        admin_users = self.wecom_config.get("admin_users", [])
+        admin_users = self._admin_users
         if not admin_users:
             logger.info("No admin users configured")
             return False
 
         logger.info(f"Attempting to send test notification to admins: {admin_users}")
 
-        from datetime import datetime
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         test_message = f"""🧪 管理员通知测试
@@ -989,14 +1101,11 @@ class WeComService:
 
 提示：您自己发起的下载不会重复通知"""
 
-        success_count = 0
-        for admin in admin_users:
-            try:
-                await self._safe_notify(test_message, touser=admin)
-                logger.info(f"Test notification sent to admin {admin}")
-                success_count += 1
-            except Exception as e:
-                logger.error(f"Failed to send test to admin {admin}: {e}")
+        success_count = await self._fan_out_to_admins(
+            admin_users,
+            lambda admin: self._safe_notify(test_message, touser=admin),
+            "Test notification",
+        )
 
         return success_count > 0
 
@@ -8,6 +8,7 @@ import json
 import logging
 import tempfile
 import platform
+import time
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
 import subprocess
@@ -15,6 +16,9 @@ from .cookiecloud import CookieCloud
 
 logger = logging.getLogger(__name__)
 
+# How long (seconds) the cookies file existence check is reused by status polls
+COOKIES_EXIST_TTL = 5
+
 
 class BrowserCookieExtractor:
     """Extract cookies from browsers for yt-dlp"""
@@ -41,6 +45,8 @@ class BrowserCookieExtractor:
         # Paths for persistent storage
         self.cookies_file = os.path.join(self.config_dir, "browser_cookies.txt")
         self.metadata_file = os.path.join(self.config_dir, "browser_cookies_meta.json")
+        # Memoized existence of cookies_file: (checked_at monotonic, exists)
+        self._cookies_exist_cache: Optional[Tuple[float, bool]] = None
 
         # Check for Cookie Bridge URL (for Docker environments)
         self.cookie_bridge_url = os.environ.get('COOKIE_BRIDGE_URL')
@@ -48,13 +54,8 @@ class BrowserCookieExtractor:
 
         # Initialize CookieCloud if config provided
         self.cookiecloud = None
-        if cookiecloud_config and cookiecloud_config.get('enabled'):
-            self.cookiecloud = CookieCloud(cookiecloud_config)
-            self.cookiecloud_auto_sync = cookiecloud_config.get('auto_sync', True)
-            self.cookiecloud_sync_interval = timedelta(
-                minutes=cookiecloud_config.get('sync_interval_minutes', 30)
-            )
-            self.last_cookiecloud_sync = None
+        self.last_cookiecloud_sync = None
+        self.update_cookiecloud_config(cookiecloud_config)
 
         # Load cached cookies from disk if available
         self.load_cached_cookies()
@@ -598,8 +599,42 @@ class BrowserCookieExtractor:
 
         return self.cookiecloud.test_connection()
 
+    def update_cookiecloud_config(self, cookiecloud_config: Dict = None) -> None:
+        """Apply CookieCloud settings, keeping cached cookies and the existing client
+        unless the connection settings (server, uuid, password) changed."""
+        if not cookiecloud_config or not cookiecloud_config.get('enabled'):
+            self.cookiecloud = None
+            return
+
+        connection = (
+            cookiecloud_config.get('server_url', '').rstrip('/'),
+            cookiecloud_config.get('uuid_key', ''),
+            cookiecloud_config.get('password', ''),
+        )
+        current = self.cookiecloud
+        if current is None or (current.server_url, current.uuid_key, current.password) != connection:
+            self.cookiecloud = CookieCloud(cookiecloud_config)
+            self.last_cookiecloud_sync = None
+
+        self.cookiecloud_auto_sync = cookiecloud_config.get('auto_sync', True)
+        self.cookiecloud_sync_interval = timedelta(
+            minutes=cookiecloud_config.get('sync_interval_minutes', 30)
+        )
+
+    def cookies_file_exists(self) -> bool:
+        """Whether cookies_file exists, re-checked at most every COOKIES_EXIST_TTL seconds"""
+        now = time.monotonic()
+        cached = self._cookies_exist_cache
+        if cached and now - cached[0] < COOKIES_EXIST_TTL:
+            return cached[1]
+        exists = os.path.exists(self.cookies_file)
+        self._cookies_exist_cache = (now, exists)
+        return exists
+
     def save_cached_cookies(self, cookies_data: Dict[str, Any]) -> bool:
         """Save cookies and metadata to disk for persistence"""
+        # The file is about to change; force the next status check to stat it
+        self._cookies_exist_cache = None
         try:
             # Save cookies content
             with open(self.cookies_file, 'w') as f:
@@ -1,9 +1,31 @@
-import json
+import copy
 import os
-from typing import Dict, Any, Optional
+import re
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import orjson
+
+# 自定义参数解析，如 "--concurrent-fragments 5" -> ("concurrent-fragments", "5")
+_PARAM_RE = re.compile(r"(\S+)(?:\s+(.+))?", re.S)
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """一次性写入临时文件并 fsync，再用 os.replace 原子替换目标文件"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb', buffering=0) as f:
+        f.write(data)
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
 
 
 class Config:
+    # 按文件路径缓存已解析的配置：{config_file: (mtime, merged_config)}
+    # 缓存中的字典不直接交给实例，取出和存入时都复制，各个Config实例互不影响
+    _cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+    _cache_lock = threading.Lock()
+
     def __init__(self, config_file: str = None):
         if config_file is None:
             # Check if running in Docker container
@@ -65,22 +87,34 @@ class Config:
                 "default_format_id": "bestvideo[ext=mp4]+bestaudio[ext=m4a]/bestvideo+bestaudio/best",
                 "proxy_domain": "",
                 "admin_users": [],
-                "notify_admin": False
+                "notify_admin": False,
+                # 快速通知：不探测视频信息，仅发送文本确认
+                "fast_notify": False
             }
         }
+        # 针对当前配置生成的yt-dlp选项构建函数，配置或cookies变化时失效
+        self._opts_builder: Optional[Callable[[Optional[Dict]], Dict[str, Any]]] = None
+        # 企业微信配置的只读视图，配置变化时重建
+        self._wecom_view: Optional[Mapping[str, Any]] = None
         self.config = self.load_config()
 
     def load_config(self) -> Dict[str, Any]:
-        """加载配置文件"""
+        """加载配置文件（文件未变化时直接复用缓存）"""
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    loaded = json.load(f)
+                with self._cache_lock:
+                    mtime = os.stat(self.config_file).st_mtime
+                    cached = self._cache.get(self.config_file)
+                    if cached and cached[0] == mtime:
+                        return copy.deepcopy(cached[1])
+                    with open(self.config_file, 'rb') as f:
+                        loaded = orjson.loads(f.read())
                     # 合并默认配置和加载的配置
                     merged = self._deep_merge(self.default_config, loaded)
-                    print(f"[CONFIG] Loaded config from {self.config_file}")
-                    print(f"[CONFIG] Config after load has ffmpeg: {'ffmpeg' in merged}")
-                    return merged
+                    self._cache[self.config_file] = (mtime, copy.deepcopy(merged))
+                print(f"[CONFIG] Loaded config from {self.config_file}")
+                print(f"[CONFIG] Config after load has ffmpeg: {'ffmpeg' in merged}")
+                return merged
             except Exception as e:
                 print(f"Error loading config: {e}")
                 print("Falling back to default config")
@@ -90,6 +124,16 @@ class Config:
             self._create_default_config()
         return self.default_config.copy()
 
+    def reload(self) -> None:
+        """重新加载配置（仅当配置文件被修改时才重新解析）"""
+        self.config = self.load_config()
+        self.invalidate_ydl_opts()
+        self._wecom_view = None
+
+    def invalidate_ydl_opts(self) -> None:
+        """使缓存的yt-dlp基础选项失效（配置、cookies文件变化后调用）"""
+        self._opts_builder = None
+
     def save_config(self) -> bool:
         """保存配置文件"""
         try:
@@ -99,8 +143,10 @@ class Config:
             if 'ffmpeg' in self.config:
                 print(f"[CONFIG] FFmpeg config: {self.config['ffmpeg']}")
 
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=4, ensure_ascii=False)
+            data = orjson.dumps(self.config, option=orjson.OPT_INDENT_2)
+            with self._cache_lock:
+                atomic_write(self.config_file, data)
+                self._cache[self.config_file] = (os.stat(self.config_file).st_mtime, copy.deepcopy(self.config))
 
             # Verify the file was written
             if os.path.exists(self.config_file):
@@ -118,8 +164,7 @@ class Config:
 
     def update_config(self, updates: Dict[str, Any]) -> bool:
         """更新配置"""
-        import json
-        print(f"[CONFIG] Updating config with: {json.dumps(updates, indent=2)[:500]}...")
+        print(f"[CONFIG] Updating config with: {orjson.dumps(updates, option=orjson.OPT_INDENT_2).decode()[:500]}...")
 
         # 确保我们的配置包含所有默认字段
         if 'ffmpeg' not in self.config:
@@ -127,6 +172,8 @@ class Config:
 
         # 深度合并更新
         self.config = self._deep_merge(self.config, updates)
+        self.invalidate_ydl_opts()
+        self._wecom_view = None
         print(f"[CONFIG] Config after merge, ffmpeg section: {self.config.get('ffmpeg', 'NOT FOUND')}")
 
         # 保存配置
@@ -135,8 +182,8 @@ class Config:
 
         # Verify file was actually written
         try:
-            with open(self.config_file, 'r') as f:
-                saved_config = json.load(f)
+            with open(self.config_file, 'rb') as f:
+                saved_config = orjson.loads(f.read())
                 print(f"[CONFIG] Verified saved config has ffmpeg: {'ffmpeg' in saved_config}")
                 if 'ffmpeg' in saved_config:
                     print(f"[CONFIG] FFmpeg config in file: {saved_config['ffmpeg']}")
@@ -148,9 +195,18 @@ class Config:
         """Return the current CookieCloud configuration block."""
         return self.config.get("cookiecloud", {}).copy()
 
-    def get_wecom_config(self) -> Dict[str, Any]:
-        """Return the current WeCom configuration block."""
-        return self.config.get("wecom", {}).copy()
+    def get_wecom_config(self) -> Mapping[str, Any]:
+        """Return a cached read-only view of the current WeCom configuration block.
+
+        List values (e.g. ``admin_users``) are frozen to tuples so the shared view
+        cannot be mutated through them either.
+        """
+        if self._wecom_view is None:
+            self._wecom_view = MappingProxyType({
+                key: tuple(value) if isinstance(value, list) else value
+                for key, value in self.config.get("wecom", {}).items()
+            })
+        return self._wecom_view
 
     def get_effective_cookies_file(self) -> Optional[str]:
         """Return the currently usable cookies file path if it exists."""
@@ -170,6 +226,24 @@ class Config:
 
     def get_ydl_opts(self, additional_opts: Optional[Dict] = None) -> Dict[str, Any]:
         """获取yt-dlp选项"""
+        if self._opts_builder is None:
+            self._opts_builder = self._make_opts_builder()
+        return self._opts_builder(additional_opts)
+
+    def _make_opts_builder(self) -> Callable[[Optional[Dict]], Dict[str, Any]]:
+        """预先计算基础选项，返回只需做一次字典合并的构建函数"""
+        base_opts = self._build_base_opts()
+
+        def build(additional_opts: Optional[Dict] = None) -> Dict[str, Any]:
+            # 合并额外选项
+            if additional_opts:
+                return {**base_opts, **additional_opts}
+            return base_opts.copy()
+
+        return build
+
+    def _build_base_opts(self) -> Dict[str, Any]:
+        """根据当前配置构建yt-dlp基础选项"""
         # Check if running in Docker for environment-specific settings
         is_docker = os.path.exists("/app")
 
@@ -233,47 +307,53 @@ class Config:
             opts['proxy'] = self.config.get('proxy')
 
         # 处理自定义参数
-        custom_params = self.config.get('custom_params', [])
-        for param in custom_params:
-            if param and isinstance(param, str):
-                # 解析参数，如 "--concurrent-fragments 5"
-                parts = param.strip().split(None, 1)
-                if len(parts) == 2:
-                    key = parts[0].lstrip('-').replace('-', '_')
-                    try:
-                        # 尝试将值转换为数字
-                        value = int(parts[1])
-                    except ValueError:
-                        try:
-                            value = float(parts[1])
-                        except ValueError:
-                            # 如果不是数字，保持字符串
-                            value = parts[1]
-                    opts[key] = value
-                elif len(parts) == 1:
-                    # 布尔类型参数
-                    key = parts[0].lstrip('-').replace('-', '_')
-                    opts[key] = True
-
-        # 合并额外选项
-        if additional_opts:
-            opts.update(additional_opts)
+        opts.update(self._parse_custom_params(custom_params))
 
         return opts
 
+    @staticmethod
+    def _parse_custom_params(custom_params: List[Any]) -> Dict[str, Any]:
+        """将自定义参数列表（如 "--concurrent-fragments 5"）解析为yt-dlp选项"""
+        parsed: Dict[str, Any] = {}
+        for param in custom_params:
+            if not param or not isinstance(param, str):
+                continue
+            match = _PARAM_RE.fullmatch(param.strip())
+            if not match:
+                continue
+            key = match.group(1).lstrip('-').replace('-', '_')
+            if not key:
+                # 只有短横线（如 "--"）的参数没有对应的选项名，忽略
+                continue
+            value = match.group(2)
+            if value is None:
+                # 布尔类型参数
+                parsed[key] = True
+            else:
+                parsed[key] = Config._parse_number(value)
+        return parsed
+
+    @staticmethod
+    def _parse_number(value: str) -> Any:
+        """尝试把参数值解析为数字（先int后float），无法解析时保持字符串"""
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                # 如果不是数字，保持字符串
+                return value
+
     @staticmethod
     def _deep_merge(base: Dict[str, Any], updates: Dict[str, Any]) -> Dict[str, Any]:
         """Recursively merge dictionaries without mutating the originals."""
-        result = base.copy()
+        # 一次性构建合并后的字典，再只对嵌套的字典段（如 extra_params）递归合并
+        result = base | updates
         for key, value in updates.items():
-            if (
-                key in result
-                and isinstance(result[key], dict)
-                and isinstance(value, dict)
-            ):
-                result[key] = Config._deep_merge(result[key], value)
-            else:
-                result[key] = value
+            base_value = base.get(key)
+            if isinstance(base_value, dict) and isinstance(value, dict):
+                result[key] = Config._deep_merge(base_value, value)
         return result
 
     def _get_cookies_file(self) -> Optional[str]:
@@ -305,8 +385,7 @@ class Config:
     def _create_default_config(self) -> None:
         """创建默认配置文件"""
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.default_config, f, indent=4, ensure_ascii=False)
+            atomic_write(self.config_file, orjson.dumps(self.default_config, option=orjson.OPT_INDENT_2))
             print(f"Created default config file: {self.config_file}")
         except Exception as e:
             print(f"Error creating default config: {e}")
@@ -1,8 +1,10 @@
 import yt_dlp
 import os
+import time
 import uuid
 import logging
-from typing import Optional, Dict, Any
+import weakref
+from typing import Optional, Dict, Any, Tuple
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 from .config import Config
@@ -12,6 +14,11 @@ from .transcoder import FFmpegTranscoder
 # Setup logger
 logger = logging.getLogger(__name__)
 
+# How long (seconds) a probed info dict may be reused by the download that follows it
+INFO_CACHE_TTL = 300
+# Per-subscriber backlog of progress events; the oldest event is dropped when full
+PROGRESS_QUEUE_SIZE = 100
+
 
 class YTDownloader:
     def __init__(self, download_dir: str = "downloads"):
@@ -29,7 +36,31 @@ class YTDownloader:
         # Track 403 errors for automatic retry
         self.error_counts: Dict[str, int] = {}
         # Store 403 notification callbacks per task
-        self.notification_callbacks: Dict[str, Any] = {}
+        # task_id -> (callback, context); context is passed back as context= when not None
+        self.notification_callbacks: Dict[str, Tuple[Any, Any]] = {}
+        # Set once a task's download thread finishes (completed or error)
+        self._completion_events: Dict[str, asyncio.Event] = {}
+        # Raw yt-dlp info from get_video_info, keyed by URL: (fetched_at, info)
+        self._raw_info_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        # Progress event subscribers (one queue per WebSocket client); weak so a
+        # handler that dies without unsubscribing does not leak its queue
+        self._progress_subscribers: "weakref.WeakSet[asyncio.Queue]" = weakref.WeakSet()
+        self._progress_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Last (status, whole percent) published per task, to skip redundant events
+        self._last_published: Dict[str, Tuple[Any, int]] = {}
+        # Shared HistoryManager, attached by the app so every writer uses one in-memory copy
+        self.history_manager = None
+        # The app's event loop; error callbacks are run there because the objects they
+        # use (WeCom HTTP pool, tasks) belong to it, not to a download thread's temporary loop
+        self._app_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def attach_loop(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Bind the app's event loop; None runs callbacks on the caller's loop again"""
+        self._app_loop = loop
+
+    @property
+    def app_loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self._app_loop
 
     @staticmethod
     def _is_authentication_error(error_msg: str) -> bool:
@@ -111,8 +142,27 @@ class YTDownloader:
                 logger.warning(f"Failed to extract browser cookies from {browser}")
                 print(f"⚠️ Failed to extract cookies from {browser}")
 
+        if refreshed:
+            # Cookies file / user agent changed, rebuild cached yt-dlp options
+            self.config.invalidate_ydl_opts()
+
         return refreshed
 
+    def _cache_raw_info(self, url: str, info: Dict[str, Any]) -> None:
+        """Remember raw info so a download started right after the probe can skip re-extraction."""
+        now = time.monotonic()
+        # Drop expired entries (probes that were never followed by a download)
+        for cached_url in [u for u, (ts, _) in self._raw_info_cache.items() if now - ts >= INFO_CACHE_TTL]:
+            del self._raw_info_cache[cached_url]
+        self._raw_info_cache[url] = (now, info)
+
+    def _pop_raw_info(self, url: str) -> Optional[Dict[str, Any]]:
+        """Take the cached raw info for a URL if it is still fresh."""
+        cached = self._raw_info_cache.pop(url, None)
+        if cached and time.monotonic() - cached[0] < INFO_CACHE_TTL:
+            return cached[1]
+        return None
+
     def _progress_hook(self, task_id: str):
         def hook(d):
             if task_id in self.active_downloads:
@@ -201,9 +251,48 @@ class YTDownloader:
                     self.active_downloads[task_id]['status'] = 'error'
                     self.active_downloads[task_id]['error'] = d.get('error_msg', 'Unknown error')
 
+                self._publish_progress(task_id)
+
         return hook
 
-    async def get_video_info(self, url: str) -> Dict[str, Any]:
+    def subscribe_progress(self) -> asyncio.Queue:
+        """Register a queue that receives per-task progress events"""
+        self._progress_loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=PROGRESS_QUEUE_SIZE)
+        self._progress_subscribers.add(queue)
+        return queue
+
+    def unsubscribe_progress(self, queue: asyncio.Queue):
+        self._progress_subscribers.discard(queue)
+
+    def _publish_progress(self, task_id: str):
+        """Emit a progress event when a task's status or whole percent changes.
+
+        May be called from download threads; delivery to the subscriber queues
+        always happens on the event loop.
+        """
+        if not self._progress_subscribers:
+            return
+        status = self.active_downloads.get(task_id)
+        if not status:
+            return
+        percent = status.get('progress', {}).get('percent') or 0
+        key = (status.get('status'), int(percent))
+        if self._last_published.get(task_id) == key:
+            return
+        self._last_published[task_id] = key
+        event = {"task_id": task_id, "status": key[0], "progress": percent}
+        self._progress_loop.call_soon_threadsafe(self._fan_out_progress, event)
+
+    def _fan_out_progress(self, event: Dict[str, Any]):
+        for queue in self._progress_subscribers:
+            if queue.full():
+                # Drop the oldest event so a slow client never blocks the others
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def get_video_info(self, url: str, cache_for_download: bool = False) -> Dict[str, Any]:
+        """Probe a URL; with cache_for_download the raw info is kept for the download that follows"""
         max_retries = 3
         retry_count = 0
 
@@ -244,6 +333,8 @@ class YTDownloader:
 
             try:
                 info = await loop.run_in_executor(self.executor, extract_info)
+                if cache_for_download:
+                    self._cache_raw_info(url, info)
                 # Success, return the info
                 return self._format_video_info(info, url)
             except Exception as e:
@@ -305,7 +396,8 @@ class YTDownloader:
                         'format_note': f.get('format_note', '') or f.get('format', ''),
                         'ext': f.get('ext', ''),
                         'quality': quality,
-                        'filesize': f.get('filesize') or f.get('filesize_approx', 0),
+                        # Consumers read only this key, so fold the approximation in here once
+                        'filesize': f.get('filesize') or f.get('filesize_approx') or 0,
                         'vcodec': f.get('vcodec', ''),
                         'acodec': f.get('acodec', ''),
                         'resolution': resolution,
@@ -330,9 +422,32 @@ class YTDownloader:
             'url': url
         }
 
-    def set_403_notification_callback(self, task_id: str, callback) -> None:
-        """Set a 403 notification callback for a specific task"""
-        self.notification_callbacks[task_id] = callback
+    def set_403_notification_callback(self, task_id: str, callback, context: Any = None) -> None:
+        """Set a 403 notification callback for a specific task.
+
+        A shared bound method can be registered with per-task ``context`` instead of
+        allocating a closure per task; it is then called with ``context=context``.
+        """
+        self.notification_callbacks[task_id] = (callback, context)
+
+    async def _dispatch_error_callback(self, task_id: str, url: str, status: str,
+                                       retry_count: int, final: bool, success: bool) -> None:
+        entry = self.notification_callbacks.get(task_id)
+        if not entry:
+            # No notification for downloads without a registered callback
+            return
+        callback, context = entry
+        if context is None:
+            coro = callback(task_id, url, status, retry_count, final, success)
+        else:
+            coro = callback(task_id, url, status, retry_count, final, success=success, context=context)
+        # Download threads call this on a temporary loop that is closed right after,
+        # so hand the callback to the app loop and wait for it there
+        loop = self._app_loop
+        if loop is None or not loop.is_running() or loop is asyncio.get_running_loop():
+            await coro
+            return
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
 
     async def download_video_with_id(self, url: str, task_id: str, format_id: Optional[str] = None) -> str:
         """Download video with pre-assigned task_id (for 403 callback setup)"""
@@ -432,20 +547,28 @@ class YTDownloader:
 
         # Log the command
         command_str = ' '.join(command_parts)
-        logger.info(f"Starting download with task_id: {task_id}")
-        logger.info(f"Equivalent yt-dlp command: {command_str}")
-        print(f"\n{'='*60}")
-        print(f"Task ID: {task_id}")
-        print(f"URL: {url}")
-        print(f"Format: {format_str}")
-        print(f"Output: {output_template}")
-        print(f"yt-dlp command: {command_str}")
-        print(f"{'='*60}\n")
+        logger.info("Starting download with task_id: %s, url: %s, format: %s, output: %s",
+                    task_id, url, format_str, output_template)
+        logger.info("Equivalent yt-dlp command: %s", command_str)
+
+        # Reuse the info probed by get_video_info just before this download, if any
+        cached_info = self._pop_raw_info(url)
 
         def download():
             try:
                 with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=True)
+                    info = None
+                    if cached_info:
+                        # Same as yt-dlp --load-info-json: re-run format selection and download
+                        # from the already extracted info instead of probing the URL again
+                        try:
+                            info = ydl.process_ie_result(ydl.sanitize_info(cached_info, remove_private_keys=True), download=True)
+                        except Exception as cached_error:
+                            # e.g. stream URLs in the cached info have expired; probe afresh
+                            logger.warning("Download from cached info failed for task %s, re-extracting: %s",
+                                           task_id, cached_error)
+                    if info is None:
+                        info = ydl.extract_info(url, download=True)
                     filename = ydl.prepare_filename(info)
 
                     # Save video info to active downloads
@@ -713,18 +836,38 @@ class YTDownloader:
 
         # Start download in background
         loop = asyncio.get_event_loop()
-        loop.run_in_executor(self.executor, download)
+        completion_event = self._completion_events.setdefault(task_id, asyncio.Event())
+        future = loop.run_in_executor(self.executor, download)
+
+        # Done callbacks run on the event loop, so setting the event here is thread-safe
+        def on_done(_):
+            completion_event.set()
+            self._publish_progress(task_id)
+
+        future.add_done_callback(on_done)
 
         return task_id
 
+    async def wait_for_completion(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Wait until the task's download finishes and return its final status"""
+        event = self._completion_events.get(task_id)
+        if event:
+            await event.wait()
+        return self.get_download_status(task_id)
+
     def get_download_status(self, task_id: str) -> Optional[Dict[str, Any]]:
         return self.active_downloads.get(task_id)
 
     def cleanup_task(self, task_id: str):
+        # Wake up anyone still waiting on a task that is being discarded
+        event = self._completion_events.pop(task_id, None)
+        if event:
+            event.set()
         if task_id in self.active_downloads:
             del self.active_downloads[task_id]
         if task_id in self.download_phases:
             del self.download_phases[task_id]
+        self._last_published.pop(task_id, None)
         if task_id in self.error_counts:
             del self.error_counts[task_id]
         if task_id in self.notification_callbacks:
@@ -772,20 +915,12 @@ class YTDownloader:
 
     async def notify_403_error(self, task_id: str, url: str, status: str, retry_count: int = 0, final: bool = False, success: bool = False) -> None:
         """Send notifications for 403 errors to admins and users via WeChat"""
-        # Check if there's a task-specific callback registered
-        callback = self.notification_callbacks.get(task_id)
-        if callback:
-            await callback(task_id, url, status, retry_count, final, success)
-        # Otherwise, no notification (for non-WeChat downloads)
+        await self._dispatch_error_callback(task_id, url, status, retry_count, final, success)
 
     async def notify_network_error(self, task_id: str, url: str, status: str, retry_count: int = 0, final: bool = False, success: bool = False) -> None:
         """Send notifications for network errors to admins and users via WeChat"""
-        # Check if there's a task-specific callback registered
-        callback = self.notification_callbacks.get(task_id)
-        if callback:
-            # Call the same callback but with network-specific status
-            await callback(task_id, url, f"[网络错误] {status}", retry_count, final, success)
-        # Otherwise, no notification (for non-WeChat downloads)
+        # Same callback, but with network-specific status
+        await self._dispatch_error_callback(task_id, url, f"[网络错误] {status}", retry_count, final, success)
 
     def _finalize_download(self, task_id: str, filename: str, url: str):
         """Finalize download with optional transcoding"""
@@ -844,9 +979,8 @@ class YTDownloader:
             }
 
             # Also update history database to persist transcoding status
-            from ytb.history_manager import HistoryManager
-            history_manager = HistoryManager()
-            history_manager.update_entry(task_id, {'status': 'transcoding'})
+            if self.history_manager is not None:
+                self.history_manager.update_entry(task_id, {'status': 'transcoding'})
 
             # Define progress callback
             async def transcode_progress(t_id: str, status: str, progress: float, current_time: float = 0, total_time: float = 0, eta: float = None):
@@ -861,6 +995,7 @@ class YTDownloader:
                     }
                     # Keep status as transcoding during the process
                     self.active_downloads[task_id]['status'] = 'transcoding'
+                    self._publish_progress(task_id)
 
             # Run transcoding
             result = await self.transcoder.transcode_video(
@@ -929,6 +1064,7 @@ class YTDownloader:
                 print(f"✅ CookieCloud sync successful: {message}")
                 self.active_downloads[task_id]['status'] = 'retrying'
                 self.active_downloads[task_id]['error'] = 'CookieCloud cookies 已同步，正在重试...'
+                self.config.invalidate_ydl_opts()
 
                 await asyncio.sleep(2)
                 return True
@@ -952,6 +1088,7 @@ class YTDownloader:
                 print(f"✅ Successfully extracted cookies from {browser}")
                 self.active_downloads[task_id]['status'] = 'retrying'
                 self.active_downloads[task_id]['error'] = f'{browser} 浏览器 Cookie 已提取，正在重试...'
+                self.config.invalidate_ydl_opts()
 
                 await asyncio.sleep(2)
                 return True
@@ -1,11 +1,18 @@
+import asyncio
 import json
 import os
+import threading
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import logging
 
+from .config import atomic_write
+
 logger = logging.getLogger(__name__)
 
+# 修改后延迟写盘的时间（秒），期间的多次修改合并为一次写入
+HISTORY_FLUSH_DELAY = 0.2
+
 
 class HistoryManager:
     def __init__(self, history_file: Optional[str] = None):
@@ -19,75 +26,155 @@ class HistoryManager:
                 history_file = os.path.join(base_dir, "config", "download_history.json")
         self.history_file = history_file
         self.history: List[Dict[str, Any]] = []
+        # task_id -> 记录 的索引，与 self.history 中的同一对象共享
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        # 下载线程（如转码）也会修改历史记录，history/_by_id/_dirty 由此锁保护
+        self._lock = threading.RLock()
+        # 延迟写盘状态：是否有未写入的修改、待执行的写盘任务，以及写盘任务所在的应用事件循环
+        self._dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self.load_history()
 
+    def attach_loop(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """绑定应用事件循环，之后的修改在该循环中延迟合并写盘；传入None则恢复立即写盘"""
+        self._loop = loop
+
+    def _reindex(self) -> None:
+        """重建索引，同一id保留最靠前（最新）的记录"""
+        self._by_id = {entry.get('id'): entry for entry in reversed(self.history)}
+
     def load_history(self) -> None:
         """从文件加载历史记录"""
+        history: List[Dict[str, Any]] = []
         if os.path.exists(self.history_file):
             try:
                 with open(self.history_file, 'r', encoding='utf-8') as f:
-                    self.history = json.load(f)
+                    history = json.load(f)
             except Exception as e:
                 logger.error(f"Error loading history: {e}")
-                self.history = []
-        else:
-            self.history = []
+        with self._lock:
+            self.history = history
+            self._reindex()
 
-    def save_history(self) -> bool:
-        """保存历史记录到文件"""
+    def _serialize(self) -> bytes:
+        with self._lock:
+            return json.dumps(self.history, indent=2, ensure_ascii=False, default=str).encode('utf-8')
+
+    def _write(self, data: bytes) -> bool:
         try:
             directory = os.path.dirname(self.history_file)
             if directory:
                 os.makedirs(directory, exist_ok=True)
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, indent=2, ensure_ascii=False, default=str)
+            atomic_write(self.history_file, data)
             return True
         except Exception as e:
             logger.error(f"Error saving history: {e}")
             return False
 
+    def save_history(self) -> bool:
+        """立即保存历史记录到文件"""
+        with self._lock:
+            self._dirty = False
+            data = self._serialize()
+        return self._write(data)
+
+    def _mark_dirty(self) -> None:
+        """标记历史记录已修改：在应用事件循环中延迟合并写盘，未绑定循环时立即写入
+
+        只使用 attach_loop 绑定的循环；下载线程中临时创建的事件循环随时会关闭，
+        不能在其上创建写盘任务。
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self.save_history()
+            return
+        with self._lock:
+            self._dirty = True
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._schedule_flush()
+            return
+        try:
+            loop.call_soon_threadsafe(self._schedule_flush)
+        except RuntimeError:
+            # 应用循环已关闭（如正在退出），直接写盘
+            self.save_history()
+
+    def _schedule_flush(self) -> None:
+        """在应用事件循环中调用：没有待执行的写盘任务时创建一个"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = self._loop.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(HISTORY_FLUSH_DELAY)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """把尚未写入的修改写入文件（在线程中写盘，不阻塞事件循环）"""
+        async with self._flush_lock:
+            while True:
+                with self._lock:
+                    if not self._dirty:
+                        break
+                    self._dirty = False
+                    # 持锁序列化，保证写入的是同一时刻的完整快照
+                    data = self._serialize()
+                await asyncio.to_thread(self._write, data)
+
     def add_entry(self, entry: Dict[str, Any]) -> None:
         """添加新的历史记录"""
         # 确保有必要的字段
         if 'downloaded_at' not in entry:
             entry['downloaded_at'] = datetime.now().isoformat()
 
-        # 添加到开头（最新的在前）
-        self.history.insert(0, entry)
+        with self._lock:
+            # 添加到开头（最新的在前）
+            self.history.insert(0, entry)
+            self._by_id[entry.get('id')] = entry
 
-        # 限制历史记录数量（可选，保留最近100条）
-        if len(self.history) > 100:
-            self.history = self.history[:100]
+            # 限制历史记录数量（可选，保留最近100条）
+            if len(self.history) > 100:
+                self.history = self.history[:100]
+                self._reindex()
 
-        self.save_history()
+        self._mark_dirty()
 
     def get_all(self) -> List[Dict[str, Any]]:
         """获取所有历史记录"""
-        return self.history
+        with self._lock:
+            return list(self.history)
 
     def get_entry(self, task_id: str) -> Optional[Dict[str, Any]]:
         """根据task_id获取历史记录"""
-        for entry in self.history:
-            if entry.get('id') == task_id:
-                return entry
-        return None
+        return self._by_id.get(task_id)
 
     def update_entry(self, task_id: str, updates: Dict[str, Any]) -> bool:
         """更新历史记录"""
-        for entry in self.history:
-            if entry.get('id') == task_id:
-                entry.update(updates)
-                self.save_history()
-                return True
-        return False
+        with self._lock:
+            entry = self._by_id.get(task_id)
+            if entry is None:
+                return False
+            entry.update(updates)
+        self._mark_dirty()
+        return True
 
     def delete_entry(self, task_id: str) -> bool:
         """删除历史记录"""
-        original_length = len(self.history)
-        self.history = [h for h in self.history if h.get('id') != task_id]
-
-        if len(self.history) < original_length:
-            self.save_history()
+        with self._lock:
+            if task_id not in self._by_id:
+                return False
+            del self._by_id[task_id]
+            original_length = len(self.history)
+            self.history = [h for h in self.history if h.get('id') != task_id]
+            removed = len(self.history) < original_length
+
+        if removed:
+            self._mark_dirty()
             return True
         return False
 
@@ -95,14 +182,17 @@ class HistoryManager:
         """清理超过指定天数的历史记录"""
         from datetime import timedelta
         cutoff_date = datetime.now() - timedelta(days=days)
-        original_length = len(self.history)
+        with self._lock:
+            original_length = len(self.history)
 
-        self.history = [
-            h for h in self.history
-            if datetime.fromisoformat(h.get('downloaded_at', ''))> cutoff_date
-        ]
+            self.history = [
+                h for h in self.history
+                if datetime.fromisoformat(h.get('downloaded_at', ''))> cutoff_date
+            ]
 
-        removed = original_length - len(self.history)
+            removed = original_length - len(self.history)
+            if removed > 0:
+                self._reindex()
         if removed > 0:
-            self.save_history()
+            self._mark_dirty()
         return removed